@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+ARTIFACT_ROOT = os.environ.get("ARTIFACT_ROOT", os.path.join("data", "artifacts"))
+ARTIFACT_MAX_BYTES = int(os.environ.get("ARTIFACT_MAX_BYTES", str(200 * 1024 * 1024)))
+RESULT_FILE = "result.json"
+STALE_STAGING_SECONDS = 3600
+
+# Function to hash the set of reviews an analysis ran over (order-independent)
+def review_set_hash(review_keys):
+    digest = hashlib.sha1()
+    for key in sorted(review_keys):
+        digest.update(key.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+# Function to hash the settings an analysis's charts and verdict depend on (any JSON-serialisable value)
+def settings_hash(settings):
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+# Content-addressed chart/result bundles, one directory per (restaurant, review set), evicted LRU by size.
+# on_evict(bundle) is called for each evicted bundle, so callers can drop anything that links to it.
+class ArtifactStore:
+    def __init__(self, root=ARTIFACT_ROOT, max_bytes=ARTIFACT_MAX_BYTES, url_prefix="/artifacts", on_evict=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # Bundle name for a place, the hash of its review set and the hash of the analysis settings, so a
+    # change of settings never serves a bundle built under the old ones
+    def bundle_key(self, place_id, reviews_hash, settings_digest=""):
+        safe_place = re.sub(r"[^A-Za-z0-9_.-]", "_", place_id)[:80]
+        content = hashlib.sha1(f"{reviews_hash}|{settings_digest}".encode("utf-8")).hexdigest()
+        return f"{safe_place}-{content[:20]}"
+
+    def bundle_dir(self, bundle):
+        return os.path.join(self.root, bundle)
+
+    # Path of one artifact, or None if the name would escape the bundle
+    def artifact_path(self, bundle, name):
+        if "/" in bundle or "\\" in bundle or bundle.startswith(".") or "/" in name or "\\" in name or name.startswith("."):
+            return None
+        return os.path.join(self.bundle_dir(bundle), name)
+
+    def url(self, bundle, name):
+        return f"{self.url_prefix}/{bundle}/{name}"
+
+    # Cached result of a finished bundle (marks the bundle as recently used), or None
+    def load_result(self, bundle):
+        path = os.path.join(self.bundle_dir(bundle), RESULT_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.touch(bundle)
+        return result
+
+    def touch(self, bundle):
+        try:
+            os.utime(self.bundle_dir(bundle))
+        except OSError:
+            pass
+
+    # Staging directory to render a bundle into before it is published
+    def begin_bundle(self):
+        return tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+
+    # Atomically publish a staged bundle together with its result, then enforce the size limit
+    def publish_bundle(self, bundle, staging_dir, result):
+        with open(os.path.join(staging_dir, RESULT_FILE), "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        try:
+            os.replace(staging_dir, self.bundle_dir(bundle))
+        except OSError:
+            # Another job published the same bundle first; its artifacts are identical
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self.evict()
+
+    def _bundle_size(self, path):
+        total = 0
+        for name in os.listdir(path):
+            try:
+                total += os.path.getsize(os.path.join(path, name))
+            except OSError:
+                pass
+        return total
+
+    # Drop least recently used bundles until the store fits in max_bytes
+    def evict(self):
+        with self._lock:
+            bundles = []
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if not os.path.isdir(path):
+                    continue
+                if name.startswith(".staging-"):
+                    # Left behind by a job that failed while rendering
+                    if time.time() - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+                        shutil.rmtree(path, ignore_errors=True)
+                    continue
+                bundles.append((os.path.getmtime(path), self._bundle_size(path), path))
+            total = sum(size for _, size, _ in bundles)
+            for _, size, path in sorted(bundles):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                logging.info("Evicted artifact bundle %s", os.path.basename(path))
+                if self.on_evict:
+                    self.on_evict(os.path.basename(path))
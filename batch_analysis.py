@@ -0,0 +1,142 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from restaurant_engine_functions import RECOMMENDATION_CLASSES
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "2"))
+BATCH_STATE_DIR = os.environ.get("BATCH_STATE_DIR", os.path.join("data", "batches"))
+RANKING_COLUMNS = [
+    "rank", "restaurant_name", "recommendation", "score", "avg_sentiment", "complaint_rate", "avg_stars",
+    "reviews", "status", "error", "url"
+]
+
+# Function to read Google Maps URLs from CSV text with a "url" column, or one URL per line otherwise.
+# Maps URLs contain commas (/@38.7,-9.1,17z/...), so only text with a "url" header is read as CSV.
+def parse_batch_urls(text):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    header = [cell.strip().lower() for cell in next(csv.reader([lines[0]]))]
+    if "url" in header:
+        column = header.index("url")
+        rows = csv.reader(io.StringIO(text))
+        next(rows)
+        candidates = [row[column].strip() if column < len(row) else "" for row in rows]
+    else:
+        # A first line that is not a URL is a header
+        candidates = lines if lines[0].startswith("http") else lines[1:]
+    urls = []
+    for url in candidates:
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+# Function to name a batch after its URL list, so resubmitting the same list resumes it
+def batch_id_for(urls):
+    return hashlib.sha1("\n".join(sorted(urls)).encode("utf-8")).hexdigest()[:16]
+
+# Batch progress persisted after every restaurant, so an interrupted or partly failed batch can resume
+class BatchState:
+    def __init__(self, batch_id, state_dir=BATCH_STATE_DIR):
+        self.batch_id = batch_id
+        self.path = os.path.join(state_dir, f"{batch_id}.json")
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_done(self, url):
+        return self.entries.get(url, {}).get("status") == "done"
+
+    def record(self, url, entry):
+        with self._lock:
+            self.entries[url] = {**entry, "url": url, "updated": datetime.now().isoformat(timespec="seconds")}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+# Function to analyse every URL with a bounded worker pool, skipping URLs a previous run finished.
+# `analyze(url)` returns the result dict of one restaurant; failures are recorded and retried on resume.
+def run_batch(urls, analyze, max_workers=BATCH_WORKERS, state=None, progress=None, fresh=False):
+    state = state or BatchState(batch_id_for(urls))
+    pending = [url for url in urls if fresh or not state.is_done(url)]
+    logging.info("Batch %s: %d of %d restaurants to analyse", state.batch_id, len(pending), len(urls))
+
+    def report():
+        if progress:
+            statuses = [state.entries.get(url, {}).get("status") for url in urls]
+            progress("batch", {
+                "batch_id": state.batch_id,
+                "total": len(urls),
+                "done": statuses.count("done"),
+                "failed": statuses.count("failed"),
+            })
+
+    report()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(analyze, url): url for url in pending}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result = future.result()
+                state.record(url, {
+                    "status": "done",
+                    **{key: result.get(key) for key in RANKING_COLUMNS if key in result},
+                })
+            except Exception as e:
+                logging.error("Batch %s: %s failed: %s", state.batch_id, url, e)
+                state.record(url, {"status": "failed", "error": str(e)})
+            report()
+    return rank_results([state.entries[url] for url in urls if url in state.entries])
+
+# Function to rank analysed restaurants: by verdict class, then score, sentiment and complaint rate
+def rank_results(entries):
+    ranking = pd.DataFrame(entries).reindex(columns=RANKING_COLUMNS)
+    ranking["class_order"] = ranking["recommendation"].map(
+        {name: i for i, name in enumerate(RECOMMENDATION_CLASSES)}
+    ).fillna(len(RECOMMENDATION_CLASSES))
+    ranking = ranking.sort_values(
+        ["class_order", "score", "avg_sentiment", "complaint_rate"], ascending=[True, False, False, True],
+        na_position="last"
+    ).drop(columns="class_order").reset_index(drop=True)
+    ranking["rank"] = range(1, len(ranking) + 1)
+    return ranking
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse and rank a batch of Google Maps restaurants")
+    parser.add_argument("input", help="CSV file with a url column, or a text file with one URL per line")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--output", help="write the ranking to this CSV file")
+    parser.add_argument("--fresh", action="store_true", help="re-analyse restaurants a previous run finished")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        urls = parse_batch_urls(f.read())
+    if not urls:
+        parser.error("no URLs found in input")
+
+    # The app module owns the review store, driver pool and pipeline
+    from main import analyze_restaurant, shutdown_workers
+    try:
+        ranking = run_batch(urls, analyze_restaurant, max_workers=args.workers, fresh=args.fresh)
+    finally:
+        shutdown_workers()
+    print(ranking.to_string(index=False))
+    if args.output:
+        ranking.to_csv(args.output, index=False)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,187 @@
+# Per-stage benchmark of the analysis pipeline on synthetic reviews, fully offline.
+# Browser stages (driver start, scroll, extract) run Chrome against the local Maps stand-in and are skipped
+# when Chrome is not available. Every run is appended to a history file and compared with earlier runs,
+# so throughput regressions show up per stage.
+# Run from the repository root: python -m benchmarks.bench_pipeline --reviews 1000 10000 100000
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import pandas as pd
+from benchmarks.synthetic_reviews import generate_reviews, scraped_rows
+from benchmarks.maps_standin import MapsStandIn, render_review_card
+
+HISTORY_PATH = os.environ.get("BENCH_HISTORY_PATH", os.path.join("data", "benchmarks", "pipeline.jsonl"))
+STAGES = ["driver_start", "scroll", "extract", "score", "date_parse", "charts"]
+
+# Function to time one call, returning (seconds, result)
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+# Function to time the browser stages against the stand-in; returns {} when Chrome cannot be started
+def bench_browser(reviews, latency, page_size):
+    from review_scraper import create_driver, find_reviews_container, iter_review_batches, extract_reviews, ScrapeMetrics
+    try:
+        seconds, driver = timed(create_driver)
+    except Exception as e:
+        logging.warning("Skipping browser stages, Chrome could not be started: %s", e)
+        return {}
+    stages = {"driver_start": {"seconds": seconds, "items": 1}}
+    try:
+        with MapsStandIn([render_review_card(review) for review in reviews], page_size=page_size, latency=latency) as standin:
+            driver.get(standin.place_url())
+            scrollable_div = find_reviews_container(driver)
+            metrics = ScrapeMetrics()
+            for _ in iter_review_batches(driver, scrollable_div, metrics=metrics):
+                pass
+            stages["scroll"] = {"seconds": metrics.scroll_time, "items": metrics.reviews_loaded,
+                                "idle_seconds": metrics.idle_time, "pages": metrics.pages_loaded}
+            # One extraction of the whole loaded panel, on top of the incremental ones inside the scroll
+            seconds, rows = timed(extract_reviews, driver, scrollable_div)
+            stages["extract"] = {"seconds": seconds, "items": len(rows)}
+    finally:
+        driver.quit()
+    return stages
+
+# Function to time the best of `repeat` calls, returning (seconds, result of the last call)
+def best_of(repeat, fn, *args, **kwargs):
+    timings = [timed(fn, *args, **kwargs) for _ in range(repeat)]
+    return min(seconds for seconds, _ in timings), timings[-1][1]
+
+# Function to time the in-process stages (scoring, date parsing, charts) on `reviews`
+def bench_analysis(reviews, repeat=3):
+    from restaurant_engine_functions import (
+        calculate_sentiment_parallel, parse_review_dates, tokenize_reviews, get_wordcloud_stopwords
+    )
+    from review_columns import ReviewColumns
+    from monthly_rollup import rollup_cells
+    import main
+
+    reviews_df = pd.DataFrame(scraped_rows(reviews))
+    stages = {}
+    seconds, scores = best_of(repeat, calculate_sentiment_parallel, reviews_df["review"])
+    reviews_df["sentiment_score"] = scores["compound"]
+    stages["score"] = {"seconds": seconds, "items": len(reviews_df)}
+
+    seconds, (dates, unparsed) = best_of(repeat, parse_review_dates, reviews_df["date"])
+    reviews_df["date_of_review"] = dates
+    stages["date_parse"] = {"seconds": seconds, "items": len(reviews_df), "unparsed": unparsed}
+
+    reviews = ReviewColumns.from_frame(reviews_df.dropna(subset=["date_of_review"]))
+    rollup = rollup_cells(reviews.dates, reviews.stars, reviews.sentiment)
+    # Stand-ins for the stored word counts the app reads
+    tokens = tokenize_reviews(reviews.texts)
+    word_frequencies = {
+        "positive": tokens.term_frequencies(reviews.sentiment > 0, get_wordcloud_stopwords()),
+        "negative": tokens.term_frequencies(reviews.sentiment < 0, get_wordcloud_stopwords()),
+    }
+    with tempfile.TemporaryDirectory() as chart_dir:
+        seconds, _ = best_of(repeat, main.render_charts, reviews, rollup, word_frequencies, chart_dir)
+    stages["charts"] = {"seconds": seconds, "items": len(reviews)}
+    return stages
+
+# Function to get the current commit, so history entries can be traced back
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+def append_history(path, entry):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+# Function to compare a stage's throughput with the median of the last `window` runs at the same size.
+# Returns (baseline reviews/s, ratio) or None without a baseline.
+def compare_with_history(history, size, stage, per_sec, window=5):
+    previous = [
+        entry["stages"][stage]["per_sec"] for entry in history
+        if entry["reviews"] == size and stage in entry["stages"] and entry["stages"][stage]["per_sec"]
+    ][-window:]
+    if not previous or not per_sec:
+        return None
+    baseline = float(pd.Series(previous).median())
+    return baseline, per_sec / baseline
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark on synthetic reviews")
+    parser.add_argument("--reviews", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--browser-reviews", type=int, default=1000,
+                        help="reviews served to Chrome for the browser stages (0 skips them)")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in delay before each page of cards")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs per in-process stage")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="flag stages slower than recent runs by more than this fraction")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--no-record", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    runs = {}
+    if args.browser_reviews:
+        runs.setdefault(args.browser_reviews, {}).update(
+            bench_browser(generate_reviews(args.browser_reviews), args.latency, args.page_size)
+        )
+    for size in args.reviews:
+        runs.setdefault(size, {}).update(bench_analysis(generate_reviews(size), args.repeat))
+
+    regressions = []
+    commit = git_commit()
+    print(f"{'reviews':>8} {'stage':<13} {'seconds':>9} {'reviews/s':>11} {'vs recent':>10}")
+    for size, stages in sorted(runs.items()):
+        if not stages:
+            continue
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            figures = stages[stage]
+            figures["per_sec"] = figures["items"] / figures["seconds"] if figures["seconds"] else 0.0
+            comparison = compare_with_history(history, size, stage, figures["per_sec"])
+            change = ""
+            if comparison is not None:
+                baseline, ratio = comparison
+                change = f"{ratio:.2f}x"
+                if ratio < 1 - args.tolerance:
+                    regressions.append(f"{stage} at {size} reviews: {figures['per_sec']:.0f}/s vs recent {baseline:.0f}/s")
+            print(f"{size:>8} {stage:<13} {figures['seconds']:>9.3f} {figures['per_sec']:>11.0f} {change:>10}")
+        if not args.no_record:
+            append_history(args.history, {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "commit": commit,
+                "reviews": size,
+                "stages": stages,
+            })
+
+    from restaurant_engine_functions import shutdown_sentiment_executor
+    shutdown_sentiment_executor()
+    if regressions:
+        print("Throughput regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
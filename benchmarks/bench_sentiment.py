@@ -0,0 +1,68 @@
+# Benchmark serial vs process-pool sentiment scoring to find the crossover point.
+# Run from the repository root: python -m benchmarks.bench_sentiment
+import argparse
+import random
+import time
+from restaurant_engine_functions import (
+    calculate_sentiment_batch, calculate_sentiment_parallel, get_sentiment_executor,
+    shutdown_sentiment_executor
+)
+
+PHRASES = [
+    "The food was amazing and the staff were lovely.",
+    "Service was slow and the waiter forgot our drinks.",
+    "Great value for money, will definitely come back!",
+    "The ambiance is cosy but the music was far too loud.",
+    "Terrible experience, cold fries and a dirty table.",
+    "Decent burger, nothing special. Prices are a bit high.",
+    "Best pizza in town :) the dough is perfect",
+    "Not bad, not great. Parking is a nightmare though.",
+]
+
+# Function to build synthetic reviews of a few sentences each
+def make_reviews(n, seed=42):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(PHRASES, k=rng.randint(1, 4))) for _ in range(n)]
+
+# Function to time the best of `repeat` runs of fn(reviews)
+def best_time(fn, reviews, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(reviews)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs process-pool sentiment scoring")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000, 3000, 5000, 10000, 20000])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm the pool up so worker start-up is not charged to the first size
+    get_sentiment_executor(args.workers)
+    calculate_sentiment_parallel(make_reviews(100), threshold=0)
+
+    crossover = None
+    print(f"{'reviews':>8} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+    for size in args.sizes:
+        reviews = make_reviews(size)
+        serial = best_time(calculate_sentiment_batch, reviews, args.repeat)
+        parallel = best_time(lambda r: calculate_sentiment_parallel(r, threshold=0), reviews, args.repeat)
+        speedup = serial / parallel
+        # Crossover is the smallest size from which parallel keeps winning
+        if speedup <= 1:
+            crossover = None
+        elif crossover is None:
+            crossover = size
+        print(f"{size:>8} {serial:>10.3f} {parallel:>11.3f} {speedup:>7.2f}x")
+
+    shutdown_sentiment_executor()
+    if crossover is None:
+        print("Parallel scoring never beat serial scoring for these sizes.")
+    else:
+        print(f"Parallel scoring wins from ~{crossover} reviews (PARALLEL_SENTIMENT_THRESHOLD).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Benchmark app start-up: how long `import main` takes in a fresh interpreter (what every worker start and
+# --reload cycle pays), which heavy libraries it pulls in, and how long the optional warm-up takes.
+# Run from the repository root: python -m benchmarks.bench_startup
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Libraries the analysis stages import on first use; none of them should load with the app
+HEAVY_MODULES = [
+    "sklearn", "scipy.sparse", "matplotlib.pyplot", "wordcloud", "vaderSentiment.vaderSentiment",
+    "selenium.webdriver", "plotly.express",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+"""
+
+WARM_UP_SCRIPT = """
+import json, time
+import main
+started = time.perf_counter()
+steps = main.warm_up()
+print(json.dumps({"seconds": time.perf_counter() - started, "steps": steps}))
+"""
+
+# Function to run a script in a fresh interpreter and return the JSON it prints last
+def run_fresh(script):
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+# Function to list the modules main imports directly, by cumulative import time (python -X importtime)
+def slowest_imports(top):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Direct imports of main are indented by exactly two spaces
+        if cumulative.strip().isdigit() and name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="App start-up time")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="show this many of the slowest direct imports")
+    parser.add_argument("--warm-up", action="store_true", help="also time main.warm_up() (starts Chrome)")
+    args = parser.parse_args()
+
+    runs = [run_fresh(IMPORT_SCRIPT % HEAVY_MODULES) for _ in range(args.repeat)]
+    timings = [run["seconds"] for run in runs]
+    print(f"import main: median {statistics.median(timings):.3f}s, min {min(timings):.3f}s over {args.repeat} runs")
+    heavy = runs[-1]["heavy"]
+    print(f"Heavy modules loaded at import: {', '.join(heavy) if heavy else 'none'}")
+
+    print(f"\n{'seconds':>8}  slowest direct imports")
+    for seconds, name in slowest_imports(args.top):
+        print(f"{seconds:>8.3f}  {name}")
+
+    if args.warm_up:
+        warm_up = run_fresh(WARM_UP_SCRIPT)
+        steps = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in warm_up["steps"].items())
+        print(f"\nwarm_up(): {warm_up['seconds']:.2f}s ({steps})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# Local stand-in for the Google Maps review panel, so the scraper can be run and benchmarked offline.
+# It serves the `m6QErb DxyBCb` scroll container with the same review card markup, a cookie-consent button,
+# the "Sort reviews" menu and scroll-triggered lazy loading (one page of cards per fetch, after `latency`).
+# Cards come from the synthetic generator or are replayed from a recorded review-panel HTML file.
+#
+#   python -m benchmarks.maps_standin --reviews 5000 --port 8765
+#   python -m benchmarks.maps_standin --fixture benchmarks/fixtures/review_panel.html --repeat 50
+#   python -m benchmarks.maps_standin record "<google maps reviews url>" benchmarks/fixtures/my_place.html
+import argparse
+import html
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from benchmarks.synthetic_reviews import iter_synthetic_reviews
+
+# Recorded panels store one card per block, separated by this marker
+CARD_SEPARATOR = "<!-- review -->"
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{name} - Google Maps</title>
+<style>
+  .m6QErb.DxyBCb {{ height: 480px; overflow-y: auto; }}
+  .jftiEf {{ min-height: 72px; padding: 8px; border-bottom: 1px solid #ddd; }}
+  #sort-menu {{ display: none; }}
+</style></head>
+<body>
+<div id="consent" style="display: none"><button class="UywwFc-LgbsSe">Accept all</button></div>
+<h1 class="DUwDvf">{name}</h1>
+<button aria-label="Sort reviews" data-value="Sort">Sort</button>
+<div id="sort-menu" role="menu">
+  <div role="menuitemradio" data-order="relevance">Most relevant</div>
+  <div role="menuitemradio" data-order="newest">Newest</div>
+</div>
+<div class="m6QErb DxyBCb kA9KIf dS8AEf" tabindex="-1"></div>
+<script>
+const container = document.querySelector('.m6QErb.DxyBCb');
+const consent = document.getElementById('consent');
+const menu = document.getElementById('sort-menu');
+let order = 'relevance', loading = false, exhausted = false;
+
+if (!document.cookie.includes('CONSENT=YES')) consent.style.display = 'block';
+consent.querySelector('button').addEventListener('click', () => {{
+  document.cookie = 'CONSENT=YES; path=/';
+  consent.remove();
+}});
+
+// Fetch the next page of cards, like Maps does when the panel is scrolled to the bottom
+async function loadMore() {{
+  if (loading || exhausted) return;
+  loading = true;
+  const start = container.querySelectorAll('div.jftiEf[data-review-id]').length;
+  const response = await fetch(`/reviews?start=${{start}}&order=${{order}}`);
+  const cards = await response.text();
+  if (cards.trim()) container.insertAdjacentHTML('beforeend', cards);
+  else exhausted = true;
+  loading = false;
+  if (!exhausted && container.scrollHeight <= container.clientHeight) loadMore();
+}}
+container.addEventListener('scroll', () => {{
+  if (container.scrollTop + container.clientHeight >= container.scrollHeight - 200) loadMore();
+}});
+
+document.querySelector('button[aria-label="Sort reviews"]').addEventListener('click', () => {{
+  menu.style.display = 'block';
+}});
+menu.querySelectorAll('[role=menuitemradio]').forEach(item => item.addEventListener('click', () => {{
+  menu.style.display = 'none';
+  order = item.dataset.order;
+  exhausted = false;
+  container.innerHTML = '';
+  loadMore();
+}}));
+loadMore();
+</script>
+</body></html>
+"""
+
+# Function to render one review the way the Maps review panel marks it up
+def render_review_card(review):
+    stars = review["stars"]
+    text = f'<div class="MyEned"><span class="wiI7pd">{html.escape(review["review"])}</span></div>' if review["review"] else ""
+    return (
+        f'<div class="jftiEf fontBodyMedium" data-review-id="{html.escape(review["review_id"])}">'
+        f'<div class="d4r55">{html.escape(review.get("author", ""))}</div>'
+        f'<span class="kvMYJc" role="img" aria-label="{stars} star{"" if stars == 1 else "s"}"></span>'
+        f'<span class="rsqaWe">{html.escape(review["date"])}</span>'
+        f'{text}</div>'
+    )
+
+# Function to read the cards of a recorded review panel, repeated `repeat` times with distinct review IDs
+def load_recorded_cards(path, repeat=1):
+    with open(path, encoding="utf-8") as f:
+        cards = [card.strip() for card in f.read().split(CARD_SEPARATOR) if "data-review-id" in card]
+    if repeat <= 1:
+        return cards
+    return [
+        re.sub(r'data-review-id="([^"]*)"', lambda m: f'data-review-id="{m.group(1)}-{copy}"', card)
+        for copy in range(repeat) for card in cards
+    ]
+
+# Fake review panel on a background HTTP server. `cards` is the rendered card HTML, newest first.
+class MapsStandIn:
+    def __init__(self, cards, page_size=10, latency=0.2, jitter=0.0, host="127.0.0.1", port=0, seed=0):
+        self.cards = cards
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.pages_served = 0
+        # "Most relevant" is a fixed shuffle of the newest-first order
+        self._relevance = list(range(len(cards)))
+        random.Random(seed).shuffle(self._relevance)
+        self._rng = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @classmethod
+    def synthetic(cls, n, seed=42, **kwargs):
+        return cls([render_review_card(review) for review in iter_synthetic_reviews(n, seed=seed)], **kwargs)
+
+    @classmethod
+    def replay(cls, path, repeat=1, **kwargs):
+        return cls(load_recorded_cards(path, repeat), **kwargs)
+
+    # URL of a fake place page; the data token gives it a place ID like a real Maps reviews URL
+    def place_url(self, name="Stand-in Bistro", place_id="0x0:0x1"):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/maps/place/{name.replace(' ', '+')}/@0,0,17z/data=!4m8!3m7!1s{place_id}!9m1!1b1"
+
+    # Card HTML of one page in the requested sort order
+    def page(self, start, order="relevance"):
+        stop = min(start + self.page_size, len(self.cards))
+        if order == "newest":
+            return "\n".join(self.cards[start:stop])
+        return "\n".join(self.cards[i] for i in self._relevance[start:stop])
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/reviews":
+                    query = parse_qs(parsed.query)
+                    delay = standin.latency + standin._rng.uniform(0, standin.jitter)
+                    if delay:
+                        time.sleep(delay)
+                    standin.pages_served += 1
+                    body = standin.page(int(query.get("start", ["0"])[0]), query.get("order", ["relevance"])[0])
+                elif parsed.path.startswith("/maps/place/"):
+                    name = parsed.path.split("/")[3].replace("+", " ")
+                    body = PAGE_TEMPLATE.format(name=html.escape(name))
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logging.debug("maps stand-in: " + format, *args)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="maps-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # Serve on the calling thread until interrupted
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+# Function to save the review panel of a live Maps page as a replayable fixture (needs Chrome and network)
+def record_review_panel(url, path, max_reviews=200):
+    from restaurant_engine_functions import force_english_google_maps
+    from review_scraper import (
+        create_driver, accept_cookies, find_reviews_container, iter_review_batches, REVIEW_CARD_SELECTOR
+    )
+    driver = create_driver()
+    try:
+        driver.get(force_english_google_maps(url))
+        accept_cookies(driver)
+        scrollable_div = find_reviews_container(driver)
+        for _ in iter_review_batches(driver, scrollable_div, max_reviews=max_reviews):
+            pass
+        cards = driver.execute_script(
+            "return Array.from(arguments[0].querySelectorAll(arguments[1])).map(card => card.outerHTML);",
+            scrollable_div, REVIEW_CARD_SELECTOR
+        )
+    finally:
+        driver.quit()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!-- Recorded from {url} -->\n")
+        f.write(f"\n{CARD_SEPARATOR}\n".join(cards[:max_reviews]))
+        f.write("\n")
+    logging.info("Recorded %d review cards to %s", min(len(cards), max_reviews), path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Google Maps review panel")
+    subparsers = parser.add_subparsers(dest="command")
+    record = subparsers.add_parser("record", help="record a live review panel as a fixture")
+    record.add_argument("url")
+    record.add_argument("path")
+    record.add_argument("--max-reviews", type=int, default=200)
+    parser.add_argument("--reviews", type=int, default=1000, help="number of synthetic reviews to serve")
+    parser.add_argument("--fixture", help="replay a recorded review panel instead of synthetic reviews")
+    parser.add_argument("--repeat", type=int, default=1, help="repeat the recorded cards this many times")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each page of cards loads")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_review_panel(args.url, args.path, args.max_reviews)
+        return
+    options = {"page_size": args.page_size, "latency": args.latency, "port": args.port}
+    if args.fixture:
+        standin = MapsStandIn.replay(args.fixture, repeat=args.repeat, **options)
+    else:
+        standin = MapsStandIn.synthetic(args.reviews, **options)
+    print(f"Serving {len(standin.cards)} reviews at {standin.place_url()}")
+    standin.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,74 @@
+# Synthetic Google Maps reviews for offline benchmarks, scaling to 100k+ reviews.
+# Reviews come out newest first (the "Newest" sort), with star ratings that agree with the text most of the time.
+import random
+
+POSITIVE_PHRASES = [
+    "The food was amazing and the staff were lovely.",
+    "Great value for money, will definitely come back!",
+    "Best pizza in town :) the dough is perfect",
+    "Friendly waiter and very quick service.",
+    "Lovely atmosphere, cosy and quiet.",
+    "The pasta was delicious and the portions generous.",
+    "Spotless place, clean tables and clean toilets.",
+    "Fair prices for the quality of the dishes.",
+]
+NEGATIVE_PHRASES = [
+    "Service was slow and the waiter forgot our drinks.",
+    "Terrible experience, cold fries and a dirty table.",
+    "Way too expensive for such small portions.",
+    "The music was far too loud and the room was cramped.",
+    "Rude staff, we waited forty minutes for a table.",
+    "The burger was overcooked and the bun was stale.",
+]
+NEUTRAL_PHRASES = [
+    "Decent burger, nothing special.",
+    "Not bad, not great. Parking is a nightmare though.",
+    "We came for lunch on a Tuesday.",
+    "The menu has a few vegetarian options.",
+]
+STAR_WEIGHTS = [0.08, 0.06, 0.12, 0.28, 0.46]
+NAMES = ["Ana", "Bruno", "Chloe", "David", "Eva", "Filipe", "Grace", "Hugo", "Ines", "Jon", "Kate", "Luis"]
+
+# Function to format an age in days the way Maps shows relative review dates
+def relative_date(age_days):
+    if age_days < 1:
+        return "today"
+    if age_days < 7:
+        return "a day ago" if age_days == 1 else f"{age_days} days ago"
+    if age_days < 30:
+        weeks = age_days // 7
+        return "a week ago" if weeks == 1 else f"{weeks} weeks ago"
+    if age_days < 365:
+        months = age_days // 30
+        return "a month ago" if months == 1 else f"{months} months ago"
+    years = age_days // 365
+    return "a year ago" if years == 1 else f"{years} years ago"
+
+# Generator of `n` review dicts (review_id, author, review, stars, date) spread over `span_days`
+def iter_synthetic_reviews(n, seed=42, span_days=3 * 365, empty_rate=0.05):
+    rng = random.Random(seed)
+    for i in range(n):
+        stars = rng.choices(range(1, 6), weights=STAR_WEIGHTS)[0]
+        # One review in ten disagrees with its own star rating, as real ones do
+        pool = POSITIVE_PHRASES if stars >= 4 else NEGATIVE_PHRASES if stars <= 2 else NEUTRAL_PHRASES
+        if rng.random() < 0.1:
+            pool = NEGATIVE_PHRASES if stars >= 4 else POSITIVE_PHRASES
+        phrases = rng.choices(pool, k=rng.randint(1, 3)) + rng.choices(NEUTRAL_PHRASES, k=rng.randint(0, 1))
+        yield {
+            "review_id": f"synthetic-{seed}-{i}",
+            "author": rng.choice(NAMES),
+            "review": "" if rng.random() < empty_rate else " ".join(phrases),
+            "stars": stars,
+            "date": relative_date(i * span_days // max(n, 1)),
+        }
+
+# Function to build all `n` synthetic reviews at once
+def generate_reviews(n, seed=42, span_days=3 * 365):
+    return list(iter_synthetic_reviews(n, seed=seed, span_days=span_days))
+
+# Function to turn synthetic reviews into the rows the scraper yields
+def scraped_rows(reviews):
+    return [
+        {"review_key": review["review_id"], "review": review["review"], "score": review["stars"], "date": review["date"]}
+        for review in reviews
+    ]
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from review_scraper import create_driver, accept_cookies
+
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.environ.get("DRIVER_MAX_USES", "25"))
+DRIVER_PROFILE_ROOT = os.environ.get("DRIVER_PROFILE_ROOT", os.path.join("data", "chrome_profiles"))
+CONSENT_URL = "https://www.google.com/maps?hl=en"
+
+# Bounded pool of warm, cookie-consented Chrome sessions that requests check out and return
+class DriverPool:
+    def __init__(self, size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES, profile_root=DRIVER_PROFILE_ROOT,
+                 checkout_timeout=300):
+        self.size = size
+        self.max_uses = max_uses
+        self.profile_root = profile_root
+        self.checkout_timeout = checkout_timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        # Each slot owns one Chrome profile directory, so consent cookies survive recycling
+        self._free_slots = list(range(size))
+        self._slot_of = {}
+        self._uses = {}
+        self._closed = False
+        self.created = 0
+        self.recycled = 0
+        self.checkouts = 0
+        self.checkout_time = 0.0
+
+    # Start a browser in a slot's profile and get the cookie-consent click out of the way
+    def _start(self, slot):
+        profile_dir = os.path.abspath(os.path.join(self.profile_root, f"slot-{slot}"))
+        os.makedirs(profile_dir, exist_ok=True)
+        driver = create_driver(profile_dir=profile_dir)
+        try:
+            driver.get(CONSENT_URL)
+            accept_cookies(driver)
+        except Exception as e:
+            logging.warning("Driver warm-up failed: %s", e)
+        with self._cond:
+            self._slot_of[id(driver)] = slot
+            self._uses[id(driver)] = 0
+            self.created += 1
+        logging.info("Started pooled Chrome driver in slot %d", slot)
+        return driver
+
+    # Cheap round-trip to check the browser is still alive
+    def _is_healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    # Quit a driver and hand its slot back to the pool
+    def _retire(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning("Error quitting driver: %s", e)
+        with self._cond:
+            self._uses.pop(id(driver), None)
+            self._free_slots.append(self._slot_of.pop(id(driver)))
+            self.recycled += 1
+            self._cond.notify()
+
+    # Borrow a driver, waiting for one to come back if the pool is exhausted
+    def checkout(self, timeout=None):
+        started = time.monotonic()
+        deadline = started + (self.checkout_timeout if timeout is None else timeout)
+        while True:
+            slot = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        driver = self._idle.pop()
+                        break
+                    if self._free_slots:
+                        slot = self._free_slots.pop()
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise TimeoutError("Timed out waiting for a free Chrome driver")
+                self.checkouts += 1
+            if slot is not None:
+                try:
+                    driver = self._start(slot)
+                except Exception:
+                    with self._cond:
+                        self._free_slots.append(slot)
+                        self._cond.notify()
+                    raise
+                self._record_checkout(started)
+                return driver
+            if self._is_healthy(driver):
+                self._record_checkout(started)
+                return driver
+            logging.warning("Discarding unhealthy pooled driver")
+            self._retire(driver)
+
+    # Time spent waiting for (or starting) a driver, including health checks
+    def _record_checkout(self, started):
+        with self._cond:
+            self.checkout_time += time.monotonic() - started
+
+    # Return a driver; it is recycled after max_uses or when it is marked unhealthy
+    def checkin(self, driver, healthy=True):
+        with self._cond:
+            self._uses[id(driver)] += 1
+            keep = healthy and not self._closed and self._uses[id(driver)] < self.max_uses
+            if keep:
+                self._idle.append(driver)
+                self._cond.notify()
+        if not keep:
+            self._retire(driver)
+
+    # Start up to `count` drivers ahead of the first request; they wait idle in the pool
+    def prewarm(self, count=1):
+        drivers = [self.checkout() for _ in range(min(count, self.size))]
+        for driver in drivers:
+            self.checkin(driver)
+
+    # Check a driver out for a with-block; a failed scrape retires it, an abandoned generator does not
+    @contextmanager
+    def session(self, timeout=None):
+        driver = self.checkout(timeout)
+        healthy = False
+        try:
+            yield driver
+            healthy = True
+        except GeneratorExit:
+            healthy = True
+            raise
+        finally:
+            self.checkin(driver, healthy=healthy)
+
+    # Usage counters for monitoring
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": len(self._slot_of) - len(self._idle),
+                "created": self.created,
+                "recycled": self.recycled,
+                "checkouts": self.checkouts,
+                "checkout_time": round(self.checkout_time, 3),
+            }
+
+    # Quit every idle driver; drivers still checked out are quit when returned
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._retire(driver)
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "20"))
+JOB_TTL = int(os.environ.get("JOB_TTL", "3600"))
+
+class QueueFullError(RuntimeError):
+    pass
+
+# State of one background analysis
+class Job:
+    def __init__(self, description=""):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.status = "queued"
+        self.stage = None
+        self.partial = None
+        self.version = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.timings = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "stage": self.stage,
+            "partial": self.partial,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "timings": dict(self.timings) if self.timings is not None else None,
+        }
+
+# Runs analyses on a bounded thread pool so request handlers never block the event loop. Every analysis,
+# queued or run as part of a batch (see run_child), holds one of max_workers slots while it runs.
+class JobManager:
+    def __init__(self, max_workers=MAX_CONCURRENT_JOBS, max_queued=MAX_QUEUED_JOBS, ttl=JOB_TTL):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.failed = 0
+
+    # Queue fn(*args, progress=callback, **kwargs); raises QueueFullError past the queue limit. A job that
+    # only coordinates others (a batch running its restaurants through run_child) passes holds_slot=False.
+    def submit(self, fn, *args, description="", holds_slot=True, **kwargs):
+        job = Job(description)
+        with self._lock:
+            self._prune()
+            if self._count("queued") >= self.max_queued:
+                raise QueueFullError(f"Too many queued jobs ({self.max_queued}), try again later")
+            self._jobs[job.id] = job
+            self.submitted += 1
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs, holds_slot)
+        return job
+
+    # Run fn(*args, progress=callback, **kwargs) on the calling thread as a job of its own (one restaurant
+    # of a batch): it waits for a free slot like a queued job, and shows in the job stats
+    def run_child(self, fn, *args, description="", **kwargs):
+        job = Job(description)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self.submitted += 1
+        return self._run(job, fn, args, kwargs)
+
+    # Register a job that is already done (answered from a cache), so clients can treat it like any other
+    def add_finished(self, result, description=""):
+        job = Job(description)
+        job.status = "done"
+        job.result = result
+        job.started = job.finished = job.created
+        job.future = Future()
+        job.future.set_result(result)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def _run(self, job, fn, args, kwargs, holds_slot=True):
+        if holds_slot:
+            self._slots.acquire()
+        try:
+            return self._run_in_slot(job, fn, args, kwargs)
+        finally:
+            if holds_slot:
+                self._slots.release()
+
+    def _run_in_slot(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        job.version += 1
+
+        # Called by the pipeline with its current stage and, optionally, provisional results
+        def progress(stage, partial=None):
+            if stage != job.stage:
+                logging.info("Job %s: %s", job.id, stage)
+            job.stage = stage
+            if partial is not None:
+                job.partial = partial
+            job.version += 1
+
+        try:
+            job.result = fn(*args, progress=progress, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            logging.error("Job %s failed: %s", job.id, e)
+            job.error = str(e)
+            job.status = "failed"
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            job.finished = time.time()
+            job.version += 1
+        return job.result
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _count(self, status):
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    # Forget finished jobs older than the TTL (caller holds the lock)
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def queue_depth(self):
+        with self._lock:
+            return self._count("queued")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._count("queued"),
+                "running": self._count("running"),
+                "submitted": self.submitted,
+                "failed": self.failed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,32 +1,132 @@
 import os
 import re
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import logging
-from datetime import datetime
-from fastapi import FastAPI, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from datetime import datetime, date
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, Form, File, UploadFile
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-import plotly.express as px
-import plotly.graph_objects as go
-from wordcloud import WordCloud
 from restaurant_engine_functions import (
-    force_english_google_maps, calculate_sentiment, calculate_review_date,
-    generate_wordcloud, extract_top_bigrams
+    force_english_google_maps, extract_place_id, submit_sentiment_batch,
+    shutdown_sentiment_executor, parse_review_dates, tokenize_reviews, generate_wordcloud_from_frequencies,
+    extract_top_bigrams, load_aspect_lexicon, ASPECT_LEXICON, get_wordcloud_stopwords,
+    preload_analysis_modules, run_topic_stage, SENTIMENT_COLUMNS
+)
+from review_scraper import scrape_review_batches, ScrapeMetrics
+from review_store import ReviewStore
+from driver_pool import DriverPool
+from job_manager import JobManager, QueueFullError
+from artifact_store import ArtifactStore, review_set_hash, settings_hash
+from batch_analysis import BATCH_WORKERS, parse_batch_urls, batch_id_for, run_batch
+from pipeline_metrics import PipelineMetrics, stage_timer, server_timing_header
+from result_cache import ResultCache, result_cache_key
+from monthly_rollup import drop_future_months, monthly_series, rollup_aspect_sentiment, rollup_star_counts
+from recommendation_scoring import (
+    review_features, score_restaurants, load_scoring_config, RunningReviewStats, DEFAULT_SCORING_CONFIG
 )
 
 # Initialize FastAPI app and templates
 app = FastAPI(title="Restaurant Recommender App")
-app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Function to get the plotly.js version the installed plotly writes figure JSON for, so the page loads
+# a matching bundle (plotly is only imported when a result page is first rendered)
+@lru_cache(maxsize=None)
+def plotly_js_version():
+    import plotly.offline
+    return plotly.offline.get_plotlyjs_version()
+
+templates.env.globals["plotly_js_version"] = plotly_js_version
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Aspect synonyms; override with a JSON file via ASPECT_LEXICON_PATH
+aspect_lexicon = (
+    load_aspect_lexicon(os.environ["ASPECT_LEXICON_PATH"]) if os.environ.get("ASPECT_LEXICON_PATH") else ASPECT_LEXICON
+)
+
+# Persistent review store, so repeat requests only scrape new reviews; it also keeps each place's
+# monthly rollup, which tags aspects with the same lexicon
+review_store = ReviewStore(aspect_lexicon=aspect_lexicon)
+
+# Warm Chrome sessions shared by requests (size and recycling via DRIVER_POOL_SIZE / DRIVER_MAX_USES)
+driver_pool = DriverPool()
+
+# Bounded background executor for analyses (MAX_CONCURRENT_JOBS / MAX_QUEUED_JOBS)
+job_manager = JobManager()
+
+# Finished analyses by canonical place ID (RESULT_CACHE_TTL / RESULT_CACHE_STALE_TTL / RESULT_CACHE_MAX_BYTES)
+result_cache = ResultCache()
+
+# Stage timings and counters, served in the Prometheus format at /metrics
+metrics = PipelineMetrics()
+metrics.add_collector(lambda: [
+    ("recommender_driver_pool_size", "gauge", driver_pool.size, "Chrome drivers the pool may hold"),
+    ("recommender_driver_pool_in_use", "gauge", driver_pool.stats()["in_use"], "Chrome drivers checked out"),
+    ("recommender_driver_pool_idle", "gauge", driver_pool.stats()["idle"], "Warm Chrome drivers waiting"),
+    ("recommender_driver_pool_checkouts_total", "counter", driver_pool.checkouts, "Driver checkouts"),
+    ("recommender_driver_pool_created_total", "counter", driver_pool.created, "Chrome drivers started"),
+    ("recommender_driver_pool_recycled_total", "counter", driver_pool.recycled, "Chrome drivers retired"),
+    ("recommender_driver_pool_checkout_seconds_total", "counter", driver_pool.checkout_time,
+     "Time spent waiting for or starting a driver"),
+])
+metrics.add_collector(lambda: [
+    ("recommender_jobs_queued", "gauge", job_manager.stats()["queued"], "Jobs waiting for a worker"),
+    ("recommender_jobs_running", "gauge", job_manager.stats()["running"], "Jobs running"),
+    ("recommender_jobs_submitted_total", "counter", job_manager.submitted, "Jobs submitted"),
+    ("recommender_jobs_failed_total", "counter", job_manager.failed, "Jobs failed"),
+])
+metrics.add_collector(lambda: [
+    ("recommender_result_cache_entries", "gauge", result_cache.stats()["entries"], "Cached analysis results"),
+    ("recommender_result_cache_bytes", "gauge", result_cache.stats()["bytes"], "Size of the cached results"),
+    ("recommender_result_cache_evictions_total", "counter", result_cache.evictions, "Cached results evicted"),
+])
+
+# Function to drop the cached results whose chart URLs point into an evicted bundle, so they are never
+# served with broken charts
+def invalidate_bundle_results(bundle):
+    prefix = artifact_store.url(bundle, "")
+    dropped = result_cache.invalidate_where(
+        lambda result: any(url.startswith(prefix) for url in result.get("charts", {}).values())
+    )
+    if dropped:
+        logging.info("Dropped %d cached results linking to evicted bundle %s", dropped, bundle)
+
+# Per-analysis chart bundles, content-addressed by place and review set (ARTIFACT_ROOT / ARTIFACT_MAX_BYTES)
+artifact_store = ArtifactStore(on_evict=invalidate_bundle_results)
+CHART_NAMES = [
+    "wordcloud_positive", "wordcloud_negative", "bigrams",
+    "sentiment_over_time", "star_distribution", "aspect_sentiment"
+]
+
+# Verdict weights and thresholds; override with a JSON file via SCORING_CONFIG_PATH
+scoring_config = (
+    load_scoring_config(os.environ["SCORING_CONFIG_PATH"]) if os.environ.get("SCORING_CONFIG_PATH")
+    else DEFAULT_SCORING_CONFIG
+)
+
+# "json" draws Plotly charts in the browser; "png" exports them server-side with Kaleido
+CHART_RENDER_MODE = os.environ.get("CHART_RENDER_MODE", "json")
+
+# Seconds between provisional verdicts while scraping (each one reads the place's rollup)
+PROVISIONAL_VERDICT_INTERVAL = float(os.environ.get("PROVISIONAL_VERDICT_INTERVAL", "1.0"))
+
+# Everything besides the reviews that shapes a bundle's charts and verdict; part of every bundle key
+ANALYSIS_SETTINGS_HASH = settings_hash({
+    "scoring": scoring_config,
+    "aspect_lexicon": aspect_lexicon,
+    "chart_render_mode": CHART_RENDER_MODE,
+})
+SCRAPED_COLUMNS = ["review_key", "review", "score", "date"]
+
 # Function to extract restaurant name
 def extract_restaurant_name(url):
     try:
@@ -38,155 +138,451 @@ def extract_restaurant_name(url):
         logging.error("Error extracting restaurant name: %s", e)
         return "Unknown Restaurant"
 
+# Set APP_WARMUP=1 to load the analysis libraries, the VADER lexicon and one Chrome driver in the
+# background at start-up, instead of on the first request
+APP_WARMUP = os.environ.get("APP_WARMUP", "0") == "1"
+
+# Function to pay the one-off costs of the first analysis ahead of time; returns seconds per step
+def warm_up():
+    timings = {}
+    with stage_timer(timings, "modules"):
+        preload_analysis_modules()
+        import plotly.express
+    try:
+        with stage_timer(timings, "driver"):
+            driver_pool.prewarm()
+    except Exception as e:
+        logging.warning("Could not warm up a Chrome driver: %s", e)
+    logging.info("Warm-up finished: %s", {step: round(seconds, 2) for step, seconds in timings.items()})
+    return timings
+
+@app.on_event("startup")
+def start_warm_up():
+    if APP_WARMUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    job_manager.shutdown()
+    shutdown_sentiment_executor()
+    driver_pool.close()
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
-@app.post("/submit", response_class=HTMLResponse)
-async def submit_url(request: Request, url: str = Form(...)):
-    try:
-        logging.info("Received URL: %s", url)
-        restaurant_name = extract_restaurant_name(url)
-        url = force_english_google_maps(url)
-        reviews_data = []
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-        # Setup Selenium WebDriver
-        options = webdriver.ChromeOptions()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        driver = webdriver.Chrome(options=options)
+@app.get("/artifacts/{bundle}/{name}")
+async def get_artifact(bundle: str, name: str):
+    path = artifact_store.artifact_path(bundle, name)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    artifact_store.touch(bundle)
+    # Bundles are content-addressed, so their files never change
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
-        driver.get(url)
+# Function to hand a Plotly figure to the browser as JSON, or export a PNG through Kaleido when opted in
+def render_figure(fig, chart_dir, name, figures):
+    if CHART_RENDER_MODE == "png":
+        fig.write_image(os.path.join(chart_dir, f"{name}.png"))
+    else:
+        figures[name] = json.loads(fig.to_json())
 
-        try:
-            accept_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, '//button[contains(@class, "UywwFc-LgbsSe")]'))
-            )
-            accept_button.click()
-        except Exception:
-            logging.warning("Cookies acceptance button not found or already accepted.")
+# Function to date one scraped batch of reviews and attach its sentiment scores (the result of
+# submit_sentiment_batch, rows in SENTIMENT_COLUMNS order)
+def score_review_batch(batch_df, scores, reference_time=None):
+    batch_df["sentiment_score"] = scores[:, SENTIMENT_COLUMNS.index("compound")]
+    batch_df["date_of_review"], unparsed_dates = parse_review_dates(batch_df["date"], reference_time)
+    metrics.inc("recommender_review_dates_unparsed_total", unparsed_dates)
+    return batch_df
 
-        try:
-            scrollable_div = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//div[contains(@class, "m6QErb") and contains(@class, "DxyBCb")]'))
-            )
-        except Exception as e:
-            driver.quit()
-            raise HTTPException(status_code=500, detail=f"Failed to locate reviews container: {str(e)}")
-
-        # Scroll reviews
-        last_height = 0
-        retry_count = 0
-        max_retries = 5
-        while retry_count < max_retries:
-            driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable_div)
-            time.sleep(2)
-            new_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_div)
-            if new_height == last_height:
-                retry_count += 1
-            else:
-                retry_count = 0
-                last_height = new_height
-
-        # Extract reviews
-        review_elements = driver.find_elements(By.XPATH, '//span[@class="wiI7pd"]')
-        star_elements = driver.find_elements(By.XPATH, '//span[@class="kvMYJc"]')
-        date_elements = driver.find_elements(By.XPATH, '//span[@class="rsqaWe"]')
-
-        for review, star, date in zip(review_elements, star_elements, date_elements):
-            try:
-                score = int(star.get_attribute("aria-label").split()[0])
-                reviews_data.append({
-                    "review": review.text,
-                    "score": score,
-                    "date": date.text
-                })
-            except Exception as e:
-                logging.error("Error parsing review: %s", e)
-
-        driver.quit()
-
-        # Process data
-        reviews_df = pd.DataFrame(reviews_data)
-        reviews_df["sentiment_score"] = reviews_df["review"].apply(calculate_sentiment)
-        reviews_df["date_of_review"] = pd.to_datetime(reviews_df["date"].apply(calculate_review_date), errors='coerce')
+# Function to draw every chart of an analysis into chart_dir; sentiment over time, the star distribution and
+# the aspect sentiment come from the place's monthly rollup, the word clouds from its stored word counts
+# ({"positive": {...}, "negative": {...}}). Returns the browser-rendered Plotly figures. Aggregation and
+# drawing are timed separately.
+def render_charts(reviews, rollup, word_frequencies, chart_dir, timings=None):
+    figures = {}
 
-        # Filter invalid dates
-        today = datetime.now()
-        reviews_df = reviews_df.dropna(subset=["date_of_review"])
-        reviews_df = reviews_df[reviews_df["date_of_review"] <= today]
-        reviews_df["year_month"] = reviews_df["date_of_review"].dt.to_period("M").dt.to_timestamp()
+    with stage_timer(timings, "aggregate"):
+        # Tokenize straight from the text buffer
+        tokens = tokenize_reviews(reviews.texts)
 
-        os.makedirs("static", exist_ok=True)
+        # Read from the rollup: work grows with the number of months, not reviews (aspect sentences were
+        # scored when their reviews were stored)
+        sentiment_over_time = monthly_series(rollup)
+        star_counts = rollup_star_counts(rollup)
+        aspect_df = rollup_aspect_sentiment(rollup, list(aspect_lexicon))
+        bigrams_df = extract_top_bigrams(tokens)
 
-       # Word Clouds
-        positive_reviews = reviews_df[reviews_df["sentiment_score"] > 0]["review"].tolist()
-        generate_wordcloud(positive_reviews, "Positive Word Cloud", "static/wordcloud_positive.png")
-    
-        negative_reviews = reviews_df[reviews_df["sentiment_score"] < 0]["review"].tolist()
-        generate_wordcloud(negative_reviews, "Negative Word Cloud", "static/wordcloud_negative.png", colormap="Reds")
+    with stage_timer(timings, "render"):
+        import plotly.express as px
+
+        # Word Clouds
+        generate_wordcloud_from_frequencies(
+            word_frequencies["positive"], "Positive Word Cloud", os.path.join(chart_dir, "wordcloud_positive.png")
+        )
+        generate_wordcloud_from_frequencies(
+            word_frequencies["negative"], "Negative Word Cloud", os.path.join(chart_dir, "wordcloud_negative.png"),
+            colormap="Reds"
+        )
 
         # Sentiment Over Time
-        sentiment_over_time = reviews_df.groupby("year_month")["sentiment_score"].mean().reset_index()
-        sentiment_over_time["year_month"] = sentiment_over_time["year_month"].dt.strftime("%Y-%m")  # Format Year-Month
-        
         fig_sentiment = px.line(
             sentiment_over_time,
             x="year_month",
             y="sentiment_score",
-            labels={"year_month": "Year-Month", "sentiment_score": "Average Sentiment Score"},
+            hover_data=["reviews", "sentiment_std"],
+            labels={"year_month": "Year-Month", "sentiment_score": "Average Sentiment Score",
+                    "reviews": "Reviews", "sentiment_std": "Standard Deviation"},
             title="Sentiment Over Time"
         )
         fig_sentiment.update_xaxes(type="category")  # Ensure Year-Month is treated as categories for proper ordering
-        fig_sentiment.write_image("static/sentiment_over_time.png")
+        render_figure(fig_sentiment, chart_dir, "sentiment_over_time", figures)
 
-        # Star Ratings Distribution
-        fig_star_dist = px.histogram(
-            reviews_df, x="score", nbins=5,
+        # Star Ratings Distribution (counted above, so the figure carries 5 bars rather than every review)
+        fig_star_dist = px.bar(
+            star_counts, x="score", y="count",
             title="Star Ratings Distribution",
             labels={"score": "Star Rating", "count": "Count"}
         )
-        fig_star_dist.write_image("static/star_distribution.png")
+        render_figure(fig_star_dist, chart_dir, "star_distribution", figures)
 
         # Aspect Sentiment
-        aspect_avg_sentiment = {
-            "food": reviews_df[reviews_df["review"].str.contains("food", case=False)]["sentiment_score"].mean(),
-            "service": reviews_df[reviews_df["review"].str.contains("service", case=False)]["sentiment_score"].mean(),
-            "ambiance": reviews_df[reviews_df["review"].str.contains("ambiance", case=False)]["sentiment_score"].mean(),
-            "price": reviews_df[reviews_df["review"].str.contains("price", case=False)]["sentiment_score"].mean(),
-        }
         fig_aspect = px.bar(
-            x=list(aspect_avg_sentiment.keys()),
-            y=list(aspect_avg_sentiment.values()),
-            labels={"x": "Aspect", "y": "Average Sentiment"},
+            aspect_df, x="aspect", y="mean_sentiment",
+            hover_data=["mentions", "sentence_sentiment"],
+            labels={"aspect": "Aspect", "mean_sentiment": "Average Sentiment",
+                    "mentions": "Reviews", "sentence_sentiment": "Sentence Sentiment"},
             title="Aspect-Based Sentiment"
         )
-        fig_aspect.write_image("static/aspect_sentiment.png")
+        render_figure(fig_aspect, chart_dir, "aspect_sentiment", figures)
 
         # Top Bigrams
-        bigrams_df = extract_top_bigrams(reviews_df["review"].tolist())
         fig_bigrams = px.bar(
             bigrams_df, x="count", y="bigram", orientation="h",
             title="Top Bigrams",
             labels={"count": "Count", "bigram": "Bigram"}
         )
-        fig_bigrams.write_image("static/bigrams.png")
+        render_figure(fig_bigrams, chart_dir, "bigrams", figures)
 
-        avg_sentiment = reviews_df["sentiment_score"].mean()
-        complaint_rate = len(reviews_df[reviews_df["sentiment_score"] < -0.05]) / len(reviews_df)
+    return figures
 
-        # Return result
-        recommendation = "Recommend" if avg_sentiment > 0.5 else "Do Not Recommend"
+# Function to run the full scrape and analysis pipeline for one restaurant (blocking; runs on a job thread).
+# Seconds spent per stage are added to `timings` and recorded in the metrics once the analysis ends.
+def analyze_restaurant(url, max_reviews=None, since_date=None, progress=None, timings=None):
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    status = "failed"
+    try:
+        result = run_analysis_pipeline(url, max_reviews, since_date, progress, timings)
+        status = "done"
+    finally:
+        metrics.observe_analysis(timings, time.perf_counter() - started, status)
+    result_cache.put(result_cache_key(extract_place_id(url), max_reviews, since_date), result)
+    return result
 
-        return templates.TemplateResponse("result.html", {
-            "request": request,
-            "restaurant_name": restaurant_name,
-            "recommendation": recommendation,
-            "avg_sentiment": round(avg_sentiment, 2),
-            "complaint_rate": round(complaint_rate, 2)
-        })
+# Function to answer from the result cache: fresh results as they are, stale ones while a background job
+# refreshes them. Returns None on a miss.
+def lookup_cached_result(url, max_reviews=None, since_date=None):
+    key = result_cache_key(extract_place_id(url), max_reviews, since_date)
+    result, state = result_cache.get(key)
+    metrics.inc("recommender_result_cache_total", result=state)
+    if state == "stale" and result_cache.begin_refresh(key):
+        try:
+            job = job_manager.submit(
+                analyze_restaurant, url, max_reviews=max_reviews, since_date=since_date, description=f"refresh {url}"
+            )
+        except QueueFullError:
+            logging.warning("Queue full; serving stale result for %s without refreshing it", key)
+            result_cache.end_refresh(key)
+        else:
+            def refresh_done(future):
+                result_cache.end_refresh(key)
+                metrics.inc("recommender_result_refreshes_total", status="failed" if future.exception() else "done")
+            job.future.add_done_callback(refresh_done)
+    return result
+
+# Function to analyse a restaurant unless the result cache already has an answer
+def analyze_restaurant_cached(url, max_reviews=None, since_date=None, progress=None, timings=None):
+    result = lookup_cached_result(url, max_reviews, since_date)
+    if result is not None:
+        return result
+    return analyze_restaurant(url, max_reviews, since_date, progress, timings)
+
+def run_analysis_pipeline(url, max_reviews, since_date, progress, timings):
+    progress = progress or (lambda stage, partial=None: None)
+    restaurant_name = extract_restaurant_name(url)
+    place_id = extract_place_id(url)
+    url = force_english_google_maps(url)
+
+    # Only scrape reviews we have not stored yet. Each batch is scored on the shared sentiment pool while
+    # the driver keeps scrolling, then dated and stored in scrape order once its scores are back; the
+    # reviews so far are scored like the final analysis for a provisional verdict before the crawl finishes
+    progress("scraping")
+    reference_time = pd.Timestamp.now()
+    with stage_timer(timings, "store"):
+        stored = review_store.load_review_columns(place_id)
+    running_stats = RunningReviewStats(scoring_config)
+    running_stats.update(stored.sentiment, stored.stars, stored.dates)
+
+    last_report = float("-inf")
+
+    def report_provisional_verdict():
+        nonlocal last_report
+        if time.perf_counter() - last_report < PROVISIONAL_VERDICT_INTERVAL:
+            return
+        with stage_timer(timings, "store"):
+            rollup = review_store.load_monthly_rollup(place_id)
+        progress("scraping", running_stats.snapshot(rollup))
+        last_report = time.perf_counter()
+
+    if running_stats.count:
+        report_provisional_verdict()
+    scrape_metrics = ScrapeMetrics()
+    new_reviews = 0
+
+    def store_batch(batch_df, scores):
+        with stage_timer(timings, "score"):
+            batch_df = score_review_batch(batch_df, scores.result(), reference_time)
+        with stage_timer(timings, "store"):
+            review_store.save_reviews(place_id, batch_df, name=restaurant_name, url=url)
+        running_stats.update(batch_df["sentiment_score"], batch_df["score"], batch_df["date_of_review"])
+        report_provisional_verdict()
+        return len(batch_df)
+
+    # Stopping at known reviews is only safe once a crawl reached the end of the panel; until this one
+    # finishes, the reviews it stores may leave a gap, so the place is marked incomplete meanwhile
+    crawl_was_complete = review_store.crawl_complete(place_id)
+    review_store.set_crawl_complete(place_id, False)
+    batches = scrape_review_batches(
+        url, known_keys=set(stored.keys), pool=driver_pool, max_reviews=max_reviews, since_date=since_date,
+        metrics=scrape_metrics, stop_at_known=crawl_was_complete
+    )
+    pending = deque()
+    for batch in batches:
+        batch_df = pd.DataFrame(batch, columns=SCRAPED_COLUMNS)
+        pending.append((batch_df, submit_sentiment_batch(batch_df["review"])))
+        while pending and pending[0][1].done():
+            new_reviews += store_batch(*pending.popleft())
+    while pending:
+        new_reviews += store_batch(*pending.popleft())
+    review_store.set_crawl_complete(place_id, scrape_metrics.stop_reason == "exhausted" or (
+        crawl_was_complete and scrape_metrics.stop_reason == "known_reviews"
+    ))
+    for stage, seconds in scrape_metrics.stage_times().items():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+    metrics.inc("recommender_reviews_scraped_total", new_reviews)
+    metrics.inc("recommender_scrape_pages_total", scrape_metrics.pages_loaded)
+    metrics.inc("recommender_scrape_idle_rounds_total", scrape_metrics.idle_rounds)
+
+    progress("scoring")
+    # Typed columns with the texts in one shared buffer, rather than a DataFrame of Python objects
+    with stage_timer(timings, "store"):
+        reviews = review_store.load_review_columns(place_id)
+    logging.info("Scraped %d new reviews, %d stored for %s", new_reviews, len(reviews), place_id)
+
+    with stage_timer(timings, "aggregate"):
+        # Filter invalid dates
+        today = np.datetime64(datetime.now().date())
+        undated = np.isnat(reviews.dates)
+        future = reviews.dates > today
+        metrics.inc("recommender_reviews_dropped_total", int(undated.sum()), reason="unparsed_date")
+        metrics.inc("recommender_reviews_dropped_total", int(future.sum()), reason="future_date")
+        reviews = reviews.select(~undated & ~future)
+        if not len(reviews):
+            raise RuntimeError(f"No dated reviews found for {place_id}")
+
+        # Reuse the charts and verdict of an identical earlier analysis of this review set
+        bundle = artifact_store.bundle_key(place_id, review_set_hash(reviews.keys), ANALYSIS_SETTINGS_HASH)
+        cached_result = artifact_store.load_result(bundle)
+    if cached_result is not None:
+        metrics.inc("recommender_artifact_cache_total", result="hit")
+        logging.info("Reusing artifact bundle %s", bundle)
+        return cached_result
+    metrics.inc("recommender_artifact_cache_total", result="miss")
+
+    progress("charting")
+    chart_dir = artifact_store.begin_bundle()
+    stopwords = get_wordcloud_stopwords()
+    with stage_timer(timings, "store"):
+        rollup = review_store.load_monthly_rollup(place_id)
+        word_frequencies = {
+            polarity: review_store.load_word_frequencies(place_id, polarity, stopwords)
+            for polarity in ("positive", "negative")
+        }
+    # Same date filter as the reviews: months after the current one only hold future-dated reviews
+    rollup = drop_future_months(rollup, today)
+    figures = render_charts(reviews, rollup, word_frequencies, chart_dir, timings)
+
+    # Every verdict feature in one vectorised pass, weighted into a score (see recommendation_scoring);
+    # the aspect score and the trend come from the same rollup as the charts
+    with stage_timer(timings, "aggregate"):
+        features = review_features(
+            np.zeros(len(reviews), dtype=np.int64), 1, reviews.sentiment, reviews.stars, reviews.dates,
+            rollup, half_life_days=scoring_config["half_life_days"],
+        )
+        verdict = score_restaurants(features, scoring_config).iloc[0]
 
+    # Topics from the place's persisted LDA model, updated with new reviews within TOPIC_TIME_BUDGET
+    with stage_timer(timings, "topics"):
+        topics_df = run_topic_stage(place_id, reviews.keys, reviews.texts, reviews.sentiment)
+    topics = [] if topics_df is None else [
+        {"topic": int(row.topic), "top_words": row.top_words, "share": round(float(row.share), 2),
+         "sentiment": None if np.isnan(row.sentiment) else round(float(row.sentiment), 2)}
+        for row in topics_df.itertuples(index=False)
+    ]
+
+    # Return result
+    result = {
+        "place_id": place_id,
+        "restaurant_name": restaurant_name,
+        "reviews": len(reviews),
+        "avg_stars": round(float(verdict["avg_stars"]), 2),
+        "recommendation": verdict["recommendation"],
+        "score": round(float(verdict["score"]), 3),
+        "avg_sentiment": round(float(verdict["avg_sentiment"]), 2),
+        "complaint_rate": round(float(verdict["complaint_rate"]), 2),
+        "trend_slope": round(float(verdict["trend_slope"]), 3),
+        "topics": topics,
+        "charts": {
+            name: artifact_store.url(bundle, f"{name}.png") for name in CHART_NAMES
+            if os.path.exists(os.path.join(chart_dir, f"{name}.png"))
+        },
+        "figures": figures
+    }
+    with stage_timer(timings, "render"):
+        artifact_store.publish_bundle(bundle, chart_dir, result)
+    return result
+
+# Function to queue an analysis, turning a full queue into a 503
+def submit_analysis_job(url, max_reviews, since_date):
+    logging.info("Received URL: %s", url)
+    timings = {}
+    with stage_timer(timings, "result_cache"):
+        cached_result = lookup_cached_result(url, max_reviews, since_date)
+    if cached_result is not None:
+        job = job_manager.add_finished(cached_result, description=url)
+        job.timings = timings
+        return job
+    try:
+        job = job_manager.submit(
+            analyze_restaurant, url, max_reviews=max_reviews, since_date=since_date, timings=timings, description=url
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    job.timings = timings
+    return job
+
+@app.post("/submit", response_class=HTMLResponse)
+async def submit_url(request: Request, url: str = Form(...), max_reviews: Optional[int] = Form(None),
+                     since_date: Optional[date] = Form(None)):
+    job = submit_analysis_job(url, max_reviews, since_date)
+    try:
+        result = await asyncio.wrap_future(job.future)
     except Exception as e:
         logging.error("An error occurred: %s", e)
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    response = templates.TemplateResponse("result.html", {"request": request, **result})
+    response.headers["Server-Timing"] = server_timing_header(job.timings)
+    return response
+
+@app.post("/jobs", status_code=202)
+async def create_job(url: str = Form(...), max_reviews: Optional[int] = Form(None),
+                     since_date: Optional[date] = Form(None)):
+    job = submit_analysis_job(url, max_reviews, since_date)
+    return {
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "result_url": f"/jobs/{job.id}/result",
+        "queue_depth": job_manager.queue_depth()
+    }
+
+@app.get("/jobs")
+async def job_stats():
+    return job_manager.stats()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job.as_dict(), "queue_depth": job_manager.queue_depth()}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Server-sent events: one message per change in stage or provisional results, until the job ends
+    async def event_stream():
+        seen_version = -1
+        while True:
+            if job.version != seen_version:
+                seen_version = job.version
+                payload = {**job.as_dict(), "queue_depth": job_manager.queue_depth()}
+                yield f"data: {json.dumps(payload)}\n\n"
+            if job.done and job.version == seen_version:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/result", response_class=HTMLResponse)
+async def job_result(request: Request, job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Error: {job.error}")
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+    if not isinstance(job.result, dict):
+        raise HTTPException(status_code=404, detail="Not a single-restaurant job")
+    response = templates.TemplateResponse("result.html", {"request": request, **job.result})
+    response.headers["Server-Timing"] = server_timing_header(job.timings)
+    return response
+
+@app.post("/batch", status_code=202)
+async def create_batch(urls: str = Form(""), file: Optional[UploadFile] = File(None), fresh: bool = Form(False)):
+    text = urls
+    if file is not None:
+        text += "\n" + (await file.read()).decode("utf-8")
+    url_list = parse_batch_urls(text)
+    if not url_list:
+        raise HTTPException(status_code=400, detail="No Google Maps URLs given")
+    # Resubmitting the same list resumes it: restaurants that already succeeded are skipped unless fresh is set
+    batch_id = batch_id_for(url_list)
+    try:
+        # Each restaurant runs as a job of its own, within MAX_CONCURRENT_JOBS like any queued analysis
+        analyze = analyze_restaurant if fresh else analyze_restaurant_cached
+        job = job_manager.submit(
+            run_batch, url_list, lambda url: job_manager.run_child(analyze, url, description=url),
+            max_workers=min(BATCH_WORKERS, job_manager.max_workers), fresh=fresh,
+            description=f"batch {batch_id}", holds_slot=False,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "job_id": job.id,
+        "batch_id": batch_id,
+        "restaurants": len(url_list),
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/batch/{job.id}"
+    }
+
+@app.get("/batch/{job_id}")
+async def batch_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Error: {job.error}")
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Batch is still {job.status}")
+    ranking = job.result
+    return {"ranking": ranking.astype(object).where(ranking.notna(), None).to_dict(orient="records")}
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Per place, month and group: review count, scored reviews, and the sum and sum of squares of their
+# compound sentiment. Group "all" covers every review, "stars=N" one star rating, "aspect=NAME" the
+# reviews mentioning that aspect; aspect cells also count the sentences that mention the aspect and sum
+# their own compound scores. Cells only ever grow, so new reviews are folded in by adding cells.
+ROLLUP_COLUMNS = [
+    "month", "group_key", "reviews", "scored", "sentiment_sum", "sentiment_squares", "sentences", "sentence_sum"
+]
+
+# Function to aggregate reviews into rollup cells (undated reviews have no month and are left out).
+# aspect_matrix is the sparse reviews x aspects mention matrix from tag_aspects, with its aspect names;
+# sentence_counts and sentence_sums are the matching matrices from aspect_sentence_sentiment.
+def rollup_cells(dates, stars, sentiment, aspect_matrix=None, aspects=(), sentence_counts=None, sentence_sums=None):
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    dated = np.flatnonzero(~np.isnat(dates))
+    months = np.datetime_as_string(dates[dated].astype("datetime64[M]"), unit="M")
+    stars = np.asarray(stars, dtype=np.int64)[dated]
+    sentiment = np.asarray(sentiment, dtype=np.float64)[dated]
+
+    # One row per (review, group) it belongs to
+    row_reviews = [np.arange(len(dated)), np.arange(len(dated))]
+    row_groups = [
+        np.full(len(dated), "all", dtype=object), np.array([f"stars={star}" for star in stars], dtype=object)
+    ]
+    row_sentences = [np.zeros(2 * len(dated))]
+    row_sentence_sums = [np.zeros(2 * len(dated))]
+    if aspect_matrix is not None and len(aspects):
+        mentions = aspect_matrix[dated].tocoo()
+        mentioned = mentions.data > 0
+        rows, cols = mentions.row[mentioned], mentions.col[mentioned]
+        row_reviews.append(rows)
+        row_groups.append(np.array([f"aspect={aspects[i]}" for i in cols], dtype=object))
+        for matrix, values in ((sentence_counts, row_sentences), (sentence_sums, row_sentence_sums)):
+            values.append(
+                np.zeros(len(rows)) if matrix is None else np.asarray(matrix[dated][rows, cols]).ravel()
+            )
+    row_reviews = np.concatenate(row_reviews)
+    scored = ~np.isnan(sentiment[row_reviews])
+    scores = np.where(scored, sentiment[row_reviews], 0.0)
+
+    rows = pd.DataFrame({
+        "month": months[row_reviews],
+        "group_key": np.concatenate(row_groups),
+        "reviews": 1,
+        "scored": scored.astype(np.int64),
+        "sentiment_sum": scores,
+        "sentiment_squares": scores * scores,
+        "sentences": np.concatenate(row_sentences).astype(np.int64),
+        "sentence_sum": np.concatenate(row_sentence_sums),
+    })
+    return rows.groupby(["month", "group_key"], as_index=False, sort=True).sum()[ROLLUP_COLUMNS]
+
+# Function to drop the months after the current one from a rollup: they only hold future-dated reviews,
+# which every analysis leaves out
+def drop_future_months(rollup, today=None):
+    today = np.datetime64(today or pd.Timestamp.now().date(), "D")
+    return rollup[rollup["month"] <= str(today.astype("datetime64[M]"))]
+
+# Function to read one group's monthly series from the rollup: reviews, mean and standard deviation
+# of sentiment per month, oldest first
+def monthly_series(rollup, group_key="all"):
+    cells = rollup[rollup["group_key"] == group_key].sort_values("month")
+    scored = cells["scored"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = cells["sentiment_sum"].to_numpy() / scored
+        variance = cells["sentiment_squares"].to_numpy() / scored - mean ** 2
+    return pd.DataFrame({
+        "year_month": cells["month"].to_numpy(),
+        "reviews": cells["reviews"].to_numpy(dtype=np.int64),
+        "sentiment_score": mean,
+        "sentiment_std": np.sqrt(np.clip(variance, 0, None)),
+    })
+
+# Function to read per-aspect totals from the rollup: reviews mentioning each aspect, their mean sentiment,
+# and the mean sentiment of the sentences mentioning it (the layout of aggregate_aspect_sentiment)
+def rollup_aspect_sentiment(rollup, aspects):
+    cells = rollup[rollup["group_key"].str.startswith("aspect=")]
+    totals = cells.groupby("group_key")[["reviews", "scored", "sentiment_sum", "sentences", "sentence_sum"]].sum()
+    totals = totals.reindex([f"aspect={aspect}" for aspect in aspects], fill_value=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame({
+            "aspect": list(aspects),
+            "mentions": totals["reviews"].to_numpy(dtype=np.int64),
+            "mean_sentiment": np.where(
+                totals["scored"] > 0, totals["sentiment_sum"] / totals["scored"].to_numpy(dtype=np.float64), np.nan
+            ),
+            "sentence_sentiment": np.where(
+                totals["sentences"] > 0, totals["sentence_sum"] / totals["sentences"].to_numpy(dtype=np.float64), np.nan
+            ),
+        })
+
+# Function to count reviews per star rating (1-5) from the rollup
+def rollup_star_counts(rollup):
+    cells = rollup[rollup["group_key"].str.startswith("stars=")]
+    counts = cells.groupby("group_key")["reviews"].sum()
+    return pd.DataFrame({
+        "score": range(1, 6),
+        "count": [int(counts.get(f"stars={star}", 0)) for star in range(1, 6)],
+    })
+
+# A trend only counts once it spans this many months with reviews and this many scored reviews,
+# and its slope (sentiment per year) is squashed with tanh(slope / TREND_SCALE) into -1..1
+TREND_MIN_MONTHS = 3
+TREND_MIN_REVIEWS = 30
+TREND_SCALE = 0.5
+
+# Function to fit, per place, a least-squares line through monthly mean sentiment, each month weighted by
+# its scored reviews, from month cells (place, month as datetime64[M] or its integer, scored reviews and
+# sentiment sum). Returns the squashed slope per place (0 where there is too little data for a trend).
+def trend_scores(place_index, n_places, months, scored, sentiment_sums):
+    place_index = np.asarray(place_index, dtype=np.int64)
+    weights = np.asarray(scored, dtype=np.float64)
+    sentiment_sums = np.asarray(sentiment_sums, dtype=np.float64)
+    x = np.asarray(months).astype("datetime64[M]").astype(np.float64)
+    if len(x):
+        x -= x.min()
+
+    def per_place(values):
+        return np.bincount(place_index, weights=values, minlength=n_places)
+
+    # Weighted sums over months; sum(w * x * mean) is sum(x * sentiment_sum)
+    total = per_place(weights)
+    sum_x = per_place(weights * x)
+    sum_y = per_place(sentiment_sums)
+    sum_xx = per_place(weights * x * x)
+    sum_xy = per_place(x * sentiment_sums)
+    months_with_reviews = per_place((weights > 0).astype(np.float64))
+    denominator = total * sum_xx - sum_x ** 2
+    enough = (months_with_reviews >= TREND_MIN_MONTHS) & (total >= TREND_MIN_REVIEWS) & (denominator > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = np.where(enough, (total * sum_xy - sum_x * sum_y) / denominator, 0.0)
+    return np.tanh(slopes * 12 / TREND_SCALE)
+
+# Function to compute each place's sentiment trend (see trend_scores) from rollup cells. place_index
+# gives each cell's place (0..n_places-1); without it every cell belongs to one place.
+def rollup_trend_slopes(rollup, place_index=None, n_places=1):
+    is_all = (rollup["group_key"] == "all").to_numpy()
+    cells = rollup[is_all]
+    return trend_scores(
+        np.zeros(len(cells)) if place_index is None else np.asarray(place_index)[is_all], n_places,
+        cells["month"].to_numpy().astype("datetime64[M]"), cells["scored"].to_numpy(), cells["sentiment_sum"].to_numpy(),
+    )
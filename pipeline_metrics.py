@@ -0,0 +1,113 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets for stage and analysis durations, in seconds (scrapes can take minutes)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+METRIC_HELP = {
+    "recommender_stage_seconds": "Time spent in each pipeline stage per analysis",
+    "recommender_analysis_seconds": "Wall time of a whole analysis",
+    "recommender_analyses_total": "Analyses finished, by outcome",
+    "recommender_reviews_scraped_total": "New reviews scraped from Google Maps",
+    "recommender_reviews_dropped_total": "Reviews left out of an analysis by the date filter",
+    "recommender_review_dates_unparsed_total": "Scraped reviews whose date could not be parsed",
+    "recommender_scrape_pages_total": "Pages of reviews loaded while scrolling",
+    "recommender_scrape_idle_rounds_total": "Scroll rounds that loaded no new reviews",
+    "recommender_artifact_cache_total": "Artifact bundle lookups, by result",
+    "recommender_result_cache_total": "Result cache lookups, by result (fresh, stale or miss)",
+    "recommender_result_refreshes_total": "Background refreshes of stale cached results, by outcome",
+}
+
+# Function to add the time spent in a with-block to timings[stage] (no-op when timings is None)
+@contextmanager
+def stage_timer(timings, stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+# Function to format stage timings as a Server-Timing header value (durations in milliseconds)
+def server_timing_header(timings):
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# In-process counters and histograms, rendered in the Prometheus text format.
+# Collectors are called at scrape time for figures owned by other components (driver pool, jobs).
+class PipelineMetrics:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    # Record the stage timings and outcome of one finished analysis
+    def observe_analysis(self, timings, seconds, status):
+        for stage, stage_seconds in timings.items():
+            self.observe("recommender_stage_seconds", stage_seconds, stage=stage)
+        self.observe("recommender_analysis_seconds", seconds)
+        self.inc("recommender_analyses_total", status=status)
+
+    # Register fn() -> [(name, "gauge" | "counter", value, help)] to be sampled on every render
+    def add_collector(self, fn):
+        self._collectors.append(fn)
+
+    def render(self):
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: {**state, "buckets": list(state["buckets"])} for key, state in series.items()}
+                for name, series in self._histograms.items()
+            }
+        lines = []
+        for name in sorted(counters):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(histograms):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, state in sorted(histograms[name].items()):
+                for bound, count in zip(self.buckets, state["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state['count']}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+                lines.append(f"{name}_count{_format_labels(key)} {state['count']}")
+        for collector in self._collectors:
+            for name, kind, value, help_text in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,247 @@
+import argparse
+import json
+import logging
+import os
+from datetime import date
+import numpy as np
+import pandas as pd
+from restaurant_engine_functions import (
+    COMPLAINT_THRESHOLD, CRITICAL_ASPECTS, MIN_AVERAGE_STARS, RECOMMENDATION_CLASSES
+)
+from monthly_rollup import drop_future_months, monthly_series, rollup_trend_slopes
+
+# Features the recommendation score is a weighted sum of, all on roughly a -1..1 scale:
+#   recent_sentiment  compound sentiment, each review weighted down by age (halves every half_life_days)
+#   star_rating       average stars mapped from 1..5 to -1..1
+#   disagreement      mean gap between a review's stars (as -1..1) and its sentiment
+#   complaint_rate    share of reviews below the complaint threshold
+#   aspect_score      mean sentiment of the critical aspects (food, service, ...) that are mentioned
+#   trend_slope       slope of monthly mean sentiment per year, squashed into -1..1 (see trend_scores)
+SCORING_FEATURES = [
+    "recent_sentiment", "star_rating", "disagreement", "complaint_rate", "aspect_score", "trend_slope"
+]
+
+# Weights and class thresholds; override any of them with a JSON file via SCORING_CONFIG_PATH
+DEFAULT_SCORING_CONFIG = {
+    "weights": {
+        "recent_sentiment": 0.6,
+        "star_rating": 0.2,
+        "disagreement": -0.2,
+        "complaint_rate": -0.5,
+        "aspect_score": 0.2,
+        "trend_slope": 0.5,
+    },
+    "must_go": 0.4,
+    "recommend": 0.15,
+    "min_stars": MIN_AVERAGE_STARS,
+    "half_life_days": 365,
+}
+
+# Function to load a scoring config from a JSON file, on top of the defaults
+def load_scoring_config(path):
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = set(overrides.get("weights", {})) - set(SCORING_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown scoring features: {', '.join(sorted(unknown))}")
+    return {
+        **DEFAULT_SCORING_CONFIG, **overrides,
+        "weights": {**DEFAULT_SCORING_CONFIG["weights"], **overrides.get("weights", {})},
+    }
+
+# Per-place review sums the review features are ratios of; sums of disjoint review sets add up, so they
+# can also be kept running while reviews arrive (see RunningReviewStats)
+REVIEW_SUMS = [
+    "reviews", "scored", "sentiment", "recency", "recent_sentiment", "stars", "disagreement", "complaints"
+]
+
+# Function to add up, per place, the review sums of one set of reviews. place_index gives each review's
+# place (0..n_places-1); undated reviews count everywhere except the recency weighting.
+def review_sums(place_index, n_places, sentiment, stars, dates, reference_date=None,
+                half_life_days=DEFAULT_SCORING_CONFIG["half_life_days"]):
+    place_index = np.asarray(place_index, dtype=np.int64)
+    sentiment = np.asarray(sentiment, dtype=np.float64)
+    stars = np.asarray(stars, dtype=np.float64)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    scored = ~np.isnan(sentiment)
+    scored_place = place_index[scored]
+    scored_sentiment = sentiment[scored]
+
+    def per_place(index, weights=None):
+        return np.bincount(index, weights=weights, minlength=n_places).astype(np.float64)
+
+    reference = np.datetime64(reference_date or date.today(), "D")
+    ages = np.clip((reference - dates).astype(np.float64), 0, None)
+    recency = np.where(~np.isnat(dates), np.exp2(-ages / half_life_days), 0.0)[scored]
+    star_scale = (stars[scored] - 3) / 2
+    return {
+        "reviews": per_place(place_index),
+        "scored": per_place(scored_place),
+        "sentiment": per_place(scored_place, scored_sentiment),
+        "recency": per_place(scored_place, recency),
+        "recent_sentiment": per_place(scored_place, recency * scored_sentiment),
+        "stars": per_place(place_index, stars),
+        "disagreement": per_place(scored_place, np.abs(star_scale - scored_sentiment)),
+        "complaints": per_place(scored_place, (scored_sentiment < COMPLAINT_THRESHOLD).astype(np.float64)),
+    }
+
+# Function to turn per-place review sums (see review_sums) into the feature table. The aspect score and the
+# trend are read from the places' monthly rollup cells, with rollup_place_index giving each cell's place
+# (omit it for a single place's rollup). Returns one row per place.
+def features_from_sums(sums, rollup, rollup_place_index=None):
+    n_places = len(sums["reviews"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_sentiment = sums["sentiment"] / sums["scored"]
+        recent_sentiment = sums["recent_sentiment"] / sums["recency"]
+        avg_stars = sums["stars"] / sums["reviews"]
+        disagreement = sums["disagreement"] / sums["scored"]
+        complaint_rate = sums["complaints"] / sums["scored"]
+    recent_sentiment = np.where(np.isnan(recent_sentiment), avg_sentiment, recent_sentiment)
+
+    return pd.DataFrame({
+        "reviews": sums["reviews"].astype(np.int64),
+        "avg_stars": avg_stars,
+        "avg_sentiment": avg_sentiment,
+        "recent_sentiment": recent_sentiment,
+        "star_rating": (avg_stars - 3) / 2,
+        "disagreement": disagreement,
+        "complaint_rate": complaint_rate,
+        "aspect_score": _aspect_scores(rollup, rollup_place_index, n_places, avg_sentiment),
+        "trend_slope": rollup_trend_slopes(rollup, rollup_place_index, n_places),
+    })
+
+# Function to compute every scoring feature for many places in one pass over the review arrays
+# (see review_sums and features_from_sums)
+def review_features(place_index, n_places, sentiment, stars, dates, rollup, rollup_place_index=None,
+                    reference_date=None, half_life_days=DEFAULT_SCORING_CONFIG["half_life_days"]):
+    sums = review_sums(place_index, n_places, sentiment, stars, dates, reference_date, half_life_days)
+    return features_from_sums(sums, rollup, rollup_place_index)
+
+# Function to average, per place, the mean sentiment of each critical aspect it has mentions of, from the
+# rollup's aspect cells. Places with no aspect mentions fall back to their plain mean sentiment.
+def _aspect_scores(rollup, rollup_place_index, n_places, fallback):
+    keys = pd.Index([f"aspect={aspect}" for aspect in CRITICAL_ASPECTS])
+    critical = rollup["group_key"].isin(keys).to_numpy()
+    if not critical.any():
+        return fallback.copy()
+    cells = rollup[critical]
+    places = np.zeros(len(cells), dtype=np.int64) if rollup_place_index is None else (
+        np.asarray(rollup_place_index, dtype=np.int64)[critical]
+    )
+    # One bin per (place, aspect)
+    bins = places * len(keys) + keys.get_indexer(cells["group_key"])
+
+    def per_place_aspect(values):
+        return np.bincount(bins, weights=values, minlength=n_places * len(keys)).reshape(n_places, len(keys))
+
+    mention_counts = per_place_aspect(cells["scored"].to_numpy(dtype=np.float64))
+    sentiment_sums = per_place_aspect(cells["sentiment_sum"].to_numpy(dtype=np.float64))
+    covered = mention_counts > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        aspect_means = np.where(covered, sentiment_sums / mention_counts, 0.0)
+        scores = aspect_means.sum(axis=1) / covered.sum(axis=1)
+    return np.where(covered.any(axis=1), scores, fallback)
+
+# Function to weight the feature table into one score per place
+def score_features(features, config=DEFAULT_SCORING_CONFIG):
+    weights = np.array([config["weights"][name] for name in SCORING_FEATURES])
+    return np.nan_to_num(features[SCORING_FEATURES].to_numpy(dtype=np.float64)) @ weights
+
+# Function to score and classify places as Must Go / Recommend / Do Not Recommend.
+# Returns the features with "score" and "recommendation" columns added.
+def score_restaurants(features, config=DEFAULT_SCORING_CONFIG):
+    scores = score_features(features, config)
+    eligible = (features["avg_stars"] >= config["min_stars"]).to_numpy()
+    scored = features.copy()
+    scored["score"] = scores
+    scored["recommendation"] = np.select(
+        [eligible & (scores >= config["must_go"]), eligible & (scores >= config["recommend"])],
+        RECOMMENDATION_CLASSES[:2], RECOMMENDATION_CLASSES[2],
+    )
+    return scored
+
+# Review sums of one place kept running batch by batch while scraping continues. A snapshot turns them into
+# features with the place's current rollup and scores them with score_restaurants, so the provisional
+# verdict is the one the finished analysis would give for the reviews stored so far.
+class RunningReviewStats:
+    def __init__(self, config=DEFAULT_SCORING_CONFIG):
+        self.config = config
+        self.count = 0
+        self.today = np.datetime64(date.today(), "D")
+        self.sums = {name: np.zeros(1) for name in REVIEW_SUMS}
+
+    # Fold in one batch of compound scores, star ratings and review dates (undated and future-dated
+    # reviews are left out, as the app's date filter does)
+    def update(self, sentiment_scores, stars, dates):
+        dates = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy().astype("datetime64[D]")
+        kept = ~np.isnat(dates) & (dates <= self.today)
+        batch = review_sums(
+            np.zeros(int(kept.sum()), dtype=np.int64), 1, np.asarray(sentiment_scores, dtype=np.float64)[kept],
+            np.asarray(stars, dtype=np.float64)[kept], dates[kept], self.today, self.config["half_life_days"],
+        )
+        for name in REVIEW_SUMS:
+            self.sums[name] += batch[name]
+        self.count += int(kept.sum())
+
+    # Provisional verdict from the running sums and the place's rollup
+    def snapshot(self, rollup):
+        if not self.count:
+            return {"reviews": 0}
+        rollup = drop_future_months(rollup, self.today)
+        verdict = score_restaurants(features_from_sums(self.sums, rollup), self.config).iloc[0]
+        monthly = monthly_series(rollup)
+        return {
+            "reviews": int(verdict["reviews"]),
+            "avg_sentiment": round(float(verdict["avg_sentiment"]), 2),
+            "complaint_rate": round(float(verdict["complaint_rate"]), 2),
+            "avg_stars": round(float(verdict["avg_stars"]), 2),
+            "score": round(float(verdict["score"]), 3),
+            "recommendation": verdict["recommendation"],
+            "monthly_sentiment": dict(zip(monthly["year_month"], monthly["sentiment_score"].round(3))),
+        }
+
+# Function to compute the features of every place in the review store, leaving out undated and
+# future-dated reviews and months as the app does
+def store_features(review_store, half_life_days=DEFAULT_SCORING_CONFIG["half_life_days"]):
+    place_ids, place_index, reviews = review_store.load_all_review_columns()
+    today = np.datetime64(date.today(), "D")
+    kept = np.flatnonzero(~np.isnat(reviews.dates) & (reviews.dates <= today))
+    reviews = reviews.select(kept)
+    rollup = drop_future_months(review_store.load_all_monthly_rollups(), today)
+    features = review_features(
+        place_index[kept], len(place_ids), reviews.sentiment, reviews.stars, reviews.dates,
+        rollup, pd.Index(place_ids).get_indexer(rollup["place_id"]), half_life_days=half_life_days,
+    )
+    features.insert(0, "place_id", place_ids)
+    return features
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score every stored restaurant with a scoring config")
+    parser.add_argument("--config", default=os.environ.get("SCORING_CONFIG_PATH"), help="JSON scoring config")
+    parser.add_argument("--features", help="read precomputed features from this CSV instead of the review store")
+    parser.add_argument("--save-features", help="write the computed features to this CSV for later runs")
+    parser.add_argument("--output", help="write the scores to this CSV file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = load_scoring_config(args.config) if args.config else DEFAULT_SCORING_CONFIG
+    if args.features:
+        features = pd.read_csv(args.features)
+    else:
+        from review_store import ReviewStore
+        from restaurant_engine_functions import load_aspect_lexicon, ASPECT_LEXICON
+        lexicon_path = os.environ.get("ASPECT_LEXICON_PATH")
+        lexicon = load_aspect_lexicon(lexicon_path) if lexicon_path else ASPECT_LEXICON
+        features = store_features(ReviewStore(aspect_lexicon=lexicon), config["half_life_days"])
+        if args.save_features:
+            features.to_csv(args.save_features, index=False)
+
+    scored = score_restaurants(features, config).sort_values("score", ascending=False)
+    print(scored["recommendation"].value_counts().reindex(RECOMMENDATION_CLASSES, fill_value=0).to_string())
+    if args.output:
+        scored.to_csv(args.output, index=False)
+    else:
+        print(scored[["place_id", "score", "recommendation"]].head(20).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
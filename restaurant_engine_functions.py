@@ -1,9 +1,20 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import multiprocessing
+import threading
+from array import array
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from sklearn.feature_extraction.text import CountVectorizer
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from concurrent.futures import ProcessPoolExecutor
+from review_columns import TextColumn
+# scipy, sklearn, matplotlib, wordcloud and VADER are slow to import, so each is imported by the
+# functions that use it; app start-up and reloads do not pay for them (see preload_analysis_modules)
 
 # Function to ensure Google Maps URLs are in English
 def force_english_google_maps(url):
@@ -14,48 +25,448 @@ def force_english_google_maps(url):
             return f"{url}?hl=en"
     return url
 
-# Function to calculate review dates
-def calculate_review_date(row_date):
-    now = datetime.now()
-    try:
-        if "month" in row_date:
-            months = int(row_date.split()[0]) if "a month ago" not in row_date else 1
-            date = now - timedelta(days=30 * months)
-        elif "year" in row_date:
-            years = int(row_date.split()[0]) if "a year ago" not in row_date else 1
-            date = now - timedelta(days=365 * years)
-        elif "week" in row_date:
-            weeks = int(row_date.split()[0]) if "a week ago" not in row_date else 1
-            date = now - timedelta(weeks=weeks)
-        elif "day" in row_date:
-            days = int(row_date.split()[0]) if "a day ago" not in row_date else 1
-            date = now - timedelta(days=days)
-        else:
-            date = now  # Default fallback
+# Query parameters that do not change which place a Maps URL points at (language and tracking)
+MAPS_IGNORED_PARAMS = {"hl", "gl", "entry", "g_ep", "g_st", "authuser", "ved", "shorturl", "skid", "coh", "ucbcb"}
+
+# Function to strip the language and tracking parameters from a Google Maps URL
+def canonical_maps_url(url):
+    parts = urlsplit(url.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in MAPS_IGNORED_PARAMS and not key.lower().startswith("utm_")
+    ]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(sorted(query)), ""))
+
+# Function to extract a stable place ID from a Google Maps URL
+def extract_place_id(url):
+    # The last "!1s0x...:0x..." token in the data segment is the place's feature ID
+    feature_ids = re.findall(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', url)
+    if feature_ids:
+        return feature_ids[-1]
+    canonical_url = canonical_maps_url(url)
+    query = dict(parse_qsl(urlsplit(canonical_url).query))
+    if re.fullmatch(r'0x[0-9a-f]+:0x[0-9a-f]+', query.get("ftid", "")):
+        return query["ftid"]
+    if query.get("cid", "").isdigit():
+        return f"cid:{query['cid']}"
+    match = re.search(r'/place/(.+?)(?:/|\?|$)', canonical_url)
+    if match:
+        return match.group(1).lower()
+    return canonical_url
+
+# Function to get wordcloud's stop-word list (wordcloud is only imported when it is first needed)
+@lru_cache(maxsize=None)
+def get_wordcloud_stopwords():
+    from wordcloud import STOPWORDS
+    return frozenset(STOPWORDS)
+
+# Function to import the heavy analysis dependencies ahead of the first request (app warm-up)
+def preload_analysis_modules():
+    import scipy.sparse
+    import sklearn.feature_extraction.text
+    import sklearn.decomposition
+    import joblib
+    import wordcloud
+    get_wordcloud_stopwords()
+    get_sentiment_analyzer()
+
+# VADER scores returned by the batched scorer, in column order
+SENTIMENT_COLUMNS = ["compound", "pos", "neg", "neu"]
+
+_sentiment_analyzer = None
+
+# Function to get the shared VADER analyzer (lexicon is loaded once per process)
+def get_sentiment_analyzer():
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _sentiment_analyzer = SentimentIntensityAnalyzer()
+    return _sentiment_analyzer
 
-        # Ensure no future dates
-        date = min(date, now)
-        return date.date()  # Return only the date part
-    except (ValueError, IndexError):
-        return now.date()  # Return today's date as fallback
+# Relative review ages ("3 weeks ago", "Edited a month ago") and their unit lengths in seconds
+RELATIVE_DATE_PATTERN = r'^(?:edited\s+)?(a|an|one|\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago$'
+DATE_UNIT_SECONDS = {
+    "second": 1, "minute": 60, "hour": 3600, "day": 86400,
+    "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400,
+}
+DATE_SPECIAL_CASES = {"just now": 0, "today": 0, "yesterday": 86400}
+
+# Function to parse a whole Series of review date strings against one reference time.
+# Returns the dates (NaT where unparseable) and the number of strings that could not be parsed.
+def parse_review_dates(date_strings, reference=None):
+    reference = pd.Timestamp.now() if reference is None else pd.Timestamp(reference)
+    cleaned = pd.Series(date_strings, dtype=object).fillna("").astype(str).str.strip().str.lower()
+
+    parts = cleaned.str.extract(RELATIVE_DATE_PATTERN)
+    amounts = pd.to_numeric(parts[0].replace({"a": "1", "an": "1", "one": "1"}), errors="coerce")
+    seconds = amounts.to_numpy(dtype=np.float64) * parts[1].map(DATE_UNIT_SECONDS).to_numpy(dtype=np.float64)
+    special = cleaned.str.replace(r"^edited\s+", "", regex=True).map(DATE_SPECIAL_CASES).to_numpy(dtype=np.float64)
+    seconds = np.where(np.isnan(seconds), special, seconds)
+
+    relative = np.isfinite(seconds)
+    dates = pd.Series(pd.NaT, index=cleaned.index, dtype="datetime64[ns]")
+    dates[relative] = reference - pd.to_timedelta(seconds[relative], unit="s")
+
+    # Anything else that looks like a date ("Mar 5, 2023", "2023-03-05") is parsed as an absolute date
+    absolute = ~relative & cleaned.str.contains(r"\d{4}", regex=True).to_numpy()
+    if absolute.any():
+        absolute_text = cleaned[absolute].str.replace(r"^edited\s+", "", regex=True)
+        dates[absolute] = pd.to_datetime(absolute_text, format="mixed", errors="coerce")
+
+    dates = dates.dt.normalize()
+    unparsed = int(dates.isna().sum())
+    if unparsed:
+        logging.warning("Could not parse %d of %d review dates", unparsed, len(dates))
+    return dates, unparsed
 
 # Function for sentiment analysis using VADER
 def calculate_sentiment(text):
-    analyzer = SentimentIntensityAnalyzer()
-    scores = analyzer.polarity_scores(text)
+    scores = get_sentiment_analyzer().polarity_scores(text)
     return scores["compound"]
 
-# Function to extract top bigrams
-def extract_top_bigrams(reviews, n=10):
+# Function to score a list or Series of reviews in one pass
+def calculate_sentiment_batch(reviews):
+    analyzer = get_sentiment_analyzer()
+    scores = np.empty((len(reviews), len(SENTIMENT_COLUMNS)), dtype=np.float64)
+    for i, text in enumerate(reviews):
+        polarity = analyzer.polarity_scores(text if isinstance(text, str) else "")
+        scores[i] = [polarity[column] for column in SENTIMENT_COLUMNS]
+    index = reviews.index if isinstance(reviews, pd.Series) else None
+    return pd.DataFrame(scores, columns=SENTIMENT_COLUMNS, index=index)
+
+# Below this many reviews the process pool costs more than it saves (see benchmarks/bench_sentiment.py)
+PARALLEL_SENTIMENT_THRESHOLD = 3000
+
+_sentiment_executor = None
+_sentiment_workers = 0
+_sentiment_executor_lock = threading.Lock()
+
+# Function to get the shared scoring pool; each worker loads the lexicon once on start-up. Workers come
+# from a fork server: the pool is first used from job threads, and forking a process with running threads
+# can copy import or logging locks they hold into the worker.
+def get_sentiment_executor(max_workers=None):
+    global _sentiment_executor, _sentiment_workers
+    with _sentiment_executor_lock:
+        if _sentiment_executor is None:
+            _sentiment_workers = max_workers or os.cpu_count() or 1
+            _sentiment_executor = ProcessPoolExecutor(
+                max_workers=_sentiment_workers, initializer=get_sentiment_analyzer,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _sentiment_executor
+
+# Function to shut the scoring pool down (e.g. on app shutdown)
+def shutdown_sentiment_executor():
+    global _sentiment_executor
+    if _sentiment_executor is not None:
+        _sentiment_executor.shutdown()
+        _sentiment_executor = None
+
+# Function run inside a worker process to score one chunk of reviews
+def _score_sentiment_chunk(reviews):
+    return calculate_sentiment_batch(reviews).to_numpy()
+
+# Function to start scoring reviews on the shared pool without waiting for them; the future's result is
+# an array with one row of SENTIMENT_COLUMNS per review
+def submit_sentiment_batch(reviews, max_workers=None):
+    return get_sentiment_executor(max_workers).submit(_score_sentiment_chunk, list(reviews))
+
+# Function to score reviews across a process pool, staying serial for small review sets
+def calculate_sentiment_parallel(reviews, threshold=PARALLEL_SENTIMENT_THRESHOLD, max_workers=None, chunks_per_worker=4):
+    if len(reviews) < threshold:
+        return calculate_sentiment_batch(reviews)
+    executor = get_sentiment_executor(max_workers)
+    texts = list(reviews)
+    n_chunks = _sentiment_workers * chunks_per_worker
+    chunk_size = -(-len(texts) // n_chunks)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    scores = np.vstack(list(executor.map(_score_sentiment_chunk, chunks)))
+    index = reviews.index if isinstance(reviews, pd.Series) else None
+    return pd.DataFrame(scores, columns=SENTIMENT_COLUMNS, index=index)
+
+COMPLAINT_THRESHOLD = -0.05
+
+# Verdict classes from best to worst; places below MIN_AVERAGE_STARS are never recommended
+RECOMMENDATION_CLASSES = ["Must Go", "Recommend", "Do Not Recommend"]
+MIN_AVERAGE_STARS = 3
+CRITICAL_ASPECTS = ["food", "service", "ambiance", "price"]
+
+# Same token rule as CountVectorizer's default, so every consumer sees identical tokens
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# Reviews normalised and tokenised once: interned token IDs in one int32 array, with per-review offsets.
+# Bigrams, word-cloud frequencies and aspect tagging all read from this instead of re-tokenising.
+class TokenizedReviews:
+    __slots__ = ("texts", "vocabulary", "token_index", "token_ids", "offsets", "_review_index")
+
+    def __init__(self, texts, vocabulary, token_index, token_ids, offsets):
+        self.texts = texts
+        self.vocabulary = vocabulary
+        self.token_index = token_index
+        self.token_ids = token_ids
+        self.offsets = offsets
+        self._review_index = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Review number of every token position
+    @property
+    def review_index(self):
+        if self._review_index is None:
+            self._review_index = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.offsets))
+        return self._review_index
+
+    # Boolean mask over the vocabulary of tokens that are in `words`
+    def vocabulary_mask(self, words):
+        mask = np.zeros(len(self.vocabulary), dtype=bool)
+        ids = [self.token_index[word] for word in words if word in self.token_index]
+        mask[ids] = True
+        return mask
+
+    # Token counts over the reviews selected by `review_mask` (all reviews if None), minus stop words
+    def term_frequencies(self, review_mask=None, stop_words=()):
+        ids = self.token_ids
+        if review_mask is not None:
+            ids = ids[np.asarray(review_mask, dtype=bool)[self.review_index]]
+        counts = np.bincount(ids, minlength=len(self.vocabulary))
+        counts[self.vocabulary_mask(stop_words)] = 0
+        present = np.flatnonzero(counts)
+        return {self.vocabulary[i]: int(counts[i]) for i in present}
+
+    # Sparse review x bigram count matrix (stop words removed first, as CountVectorizer does),
+    # plus a function mapping column indices to bigram strings
+    def bigram_matrix(self, stop_words=()):
+        from scipy import sparse
+        keep = ~self.vocabulary_mask(stop_words)[self.token_ids]
+        ids = self.token_ids[keep].astype(np.int64)
+        reviews = self.review_index[keep]
+        same_review = reviews[1:] == reviews[:-1]
+        codes = ids[:-1][same_review] * len(self.vocabulary) + ids[1:][same_review]
+        bigram_codes, columns = np.unique(codes, return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.int64), (reviews[:-1][same_review], columns)),
+            shape=(len(self), len(bigram_codes)),
+        )
+        matrix.sum_duplicates()
+        size = len(self.vocabulary)
+
+        def names(indices):
+            return np.array(
+                [f"{self.vocabulary[code // size]} {self.vocabulary[code % size]}" for code in bigram_codes[indices]],
+                dtype=object,
+            )
+        return matrix, names
+
+# Function to lowercase and tokenise a list, Series or TextColumn of reviews once into a TokenizedReviews
+def tokenize_reviews(reviews):
+    # A TextColumn is kept as is (texts are decoded from its buffer on demand); anything else is listed
+    texts = reviews if isinstance(reviews, TextColumn) else [text if isinstance(text, str) else "" for text in reviews]
+    token_index = {}
+    # Token IDs go into a typed array, not a list of Python ints
+    ids = array("i")
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    for i, text in enumerate(texts):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        ids.extend(token_index.setdefault(token, len(token_index)) for token in tokens)
+        offsets[i + 1] = len(ids)
+    return TokenizedReviews(
+        texts, list(token_index), token_index, np.array(ids, dtype=np.int32), offsets
+    )
+
+# Default aspect lexicon: aspect -> synonyms (plurals are matched automatically)
+ASPECT_LEXICON = {
+    "food": ["food", "dish", "meal", "menu", "taste", "tasty", "flavour", "flavor", "portion", "dessert", "starter"],
+    "service": ["service", "staff", "waiter", "waitress", "server", "host", "hostess", "manager", "attentive", "rude"],
+    "ambiance": ["ambiance", "ambience", "atmosphere", "decor", "music", "vibe", "cosy", "cozy", "noisy", "view"],
+    "price": ["price", "pricey", "expensive", "cheap", "value for money", "overpriced", "bill", "cost"],
+    "cleanliness": ["cleanliness", "clean", "dirty", "hygiene", "toilet", "bathroom", "restroom", "filthy"],
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Function to load an aspect lexicon from a JSON file of {"aspect": ["synonym", ...]}
+def load_aspect_lexicon(path):
+    with open(path, encoding="utf-8") as f:
+        return {aspect: list(terms) for aspect, terms in json.load(f).items()}
+
+# Function to compile a lexicon into one regex with a named group per aspect (cached per lexicon)
+@lru_cache(maxsize=8)
+def _compile_aspect_matcher(lexicon_items):
+    groups = []
+    for i, (_, terms) in enumerate(lexicon_items):
+        alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        groups.append(f"(?P<a{i}>{alternatives})")
+    return re.compile(r"\b(?:" + "|".join(groups) + r")(?:s|es)?\b", re.IGNORECASE)
+
+def _lexicon_items(lexicon):
+    return tuple((aspect, tuple(terms)) for aspect, terms in lexicon.items())
+
+# Function to tag aspects straight from token IDs: single-word synonyms (and their plurals) through a
+# vocabulary lookup table, multi-word synonyms through shifted comparisons of the token array
+def _tag_aspects_from_tokens(tokenized, items):
+    from scipy import sparse
+    aspect_of_token = np.full(len(tokenized.vocabulary), -1, dtype=np.int32)
+    rows, cols = [], []
+    ids = tokenized.token_ids
+    for i, (_, terms) in enumerate(items):
+        for term in terms:
+            words = TOKEN_PATTERN.findall(term.lower())
+            if len(words) == 1:
+                for form in (words[0], words[0] + "s", words[0] + "es"):
+                    if form in tokenized.token_index:
+                        aspect_of_token[tokenized.token_index[form]] = i
+            elif words and all(word in tokenized.token_index for word in words[:-1]):
+                # The last word may be plural, as in the regex tagger ("value for moneys")
+                last_ids = [tokenized.token_index[form] for form in (words[-1], words[-1] + "s", words[-1] + "es")
+                            if form in tokenized.token_index]
+                if not last_ids:
+                    continue
+                span = len(words)
+                starts = np.ones(max(len(ids) - span + 1, 0), dtype=bool)
+                for j, word in enumerate(words[:-1]):
+                    starts &= ids[j:len(ids) - span + 1 + j] == tokenized.token_index[word]
+                starts &= np.isin(ids[span - 1:], last_ids)
+                positions = np.flatnonzero(starts)
+                positions = positions[tokenized.review_index[positions] == tokenized.review_index[positions + span - 1]]
+                rows.append(tokenized.review_index[positions])
+                cols.append(np.full(len(positions), i, dtype=np.int32))
+    hits = aspect_of_token[ids]
+    found = np.flatnonzero(hits >= 0)
+    rows.append(tokenized.review_index[found])
+    cols.append(hits[found])
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(tokenized), len(items))
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+# Function to tag every aspect in every text in one pass (a TokenizedReviews is tagged from its tokens).
+# Returns a sparse texts x aspects matrix of mention counts and the aspect names (column order).
+def tag_aspects(texts, lexicon=ASPECT_LEXICON):
+    from scipy import sparse
+    items = _lexicon_items(lexicon)
+    aspects = [aspect for aspect, _ in items]
+    if isinstance(texts, TokenizedReviews):
+        return _tag_aspects_from_tokens(texts, items), aspects
+    matcher = _compile_aspect_matcher(items)
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        if not isinstance(text, str):
+            continue
+        for match in matcher.finditer(text):
+            rows.append(row)
+            cols.append(int(match.lastgroup[1:]))
+    data = np.ones(len(rows), dtype=np.int32)
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(texts), len(items)))
+    matrix.sum_duplicates()
+    return matrix, aspects
+
+# Function to score the sentences that mention an aspect, in the reviews review_aspects tags (VADER runs
+# once per such sentence, on the process pool for large sets). Returns sparse reviews x aspects matrices of
+# aspect-sentence counts and summed compound scores, so callers can store them per review or per month.
+def aspect_sentence_sentiment(texts, review_aspects, lexicon=ASPECT_LEXICON):
+    from scipy import sparse
+    n_reviews, n_aspects = review_aspects.shape
+    sentences, owners = [], []
+    for i in np.flatnonzero(review_aspects.getnnz(axis=1)):
+        text = texts[i]
+        if not isinstance(text, str):
+            continue
+        for sentence in SENTENCE_SPLIT.split(text):
+            if sentence:
+                sentences.append(sentence)
+                owners.append(i)
+    if not sentences:
+        empty = sparse.csr_matrix((n_reviews, n_aspects), dtype=np.float64)
+        return empty, empty.copy()
+    sentence_aspects, _ = tag_aspects(sentences, lexicon)
+    has_aspect = np.flatnonzero(sentence_aspects.getnnz(axis=1))
+    sentence_aspects = (sentence_aspects[has_aspect] > 0).astype(np.float64)
+    scores = calculate_sentiment_parallel([sentences[i] for i in has_aspect])["compound"].to_numpy()
+    owner = sparse.csr_matrix(
+        (np.ones(len(has_aspect)), (np.asarray(owners, dtype=np.int64)[has_aspect], np.arange(len(has_aspect)))),
+        shape=(n_reviews, len(has_aspect)),
+    )
+    counts = owner @ sentence_aspects
+    sums = owner @ sparse.csr_matrix(sentence_aspects.multiply(scores[:, None]))
+    return sparse.csr_matrix(counts), sparse.csr_matrix(sums)
+
+# Function to compute per-aspect mentions, mean review sentiment and sentence-level sentiment.
+# Only sentences that mention an aspect are scored; all means come from sparse matrix products.
+def aggregate_aspect_sentiment(reviews, sentiment_scores, lexicon=ASPECT_LEXICON, sentence_level=True):
+    review_aspects, aspects = tag_aspects(reviews, lexicon)
+    reviews = reviews.texts if isinstance(reviews, TokenizedReviews) else list(reviews)
+    mentioned = (review_aspects > 0).astype(np.float64)
+    review_counts = np.asarray(mentioned.sum(axis=0)).ravel()
+    review_sums = mentioned.T @ np.asarray(sentiment_scores, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_sentiment = np.where(review_counts > 0, review_sums / review_counts, np.nan)
+
+    sentence_sentiment = np.full(len(aspects), np.nan)
+    if sentence_level and review_counts.any():
+        sentence_counts, sentence_sums = aspect_sentence_sentiment(reviews, review_aspects, lexicon)
+        sentence_counts = np.asarray(sentence_counts.sum(axis=0)).ravel()
+        sentence_sums = np.asarray(sentence_sums.sum(axis=0)).ravel()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sentence_sentiment = np.where(sentence_counts > 0, sentence_sums / sentence_counts, np.nan)
+
+    return pd.DataFrame({
+        "aspect": aspects,
+        "mentions": review_counts.astype(int),
+        "mean_sentiment": mean_sentiment,
+        "sentence_sentiment": sentence_sentiment,
+    })
+
+# Function to pick the n largest column counts without sorting the whole vocabulary
+def _top_ngrams(counts, ngram_names, n):
+    n = min(n, len(counts))
+    if n == 0:
+        return pd.DataFrame({'bigram': pd.Series(dtype=object), 'count': pd.Series(dtype=np.int64)})
+    top = np.argpartition(counts, -n)[-n:]
+    top = top[np.argsort(counts[top], kind="stable")[::-1]]
+    top = top[counts[top] > 0]
+    return pd.DataFrame({'bigram': ngram_names(top), 'count': counts[top]})
+
+# Function to build the sparse document x bigram matrix and a column -> bigram name function.
+# A TokenizedReviews is paired from its token IDs; raw text goes through CountVectorizer.
+def _bigram_matrix(reviews):
+    from scipy import sparse
+    from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+    if isinstance(reviews, TokenizedReviews):
+        return reviews.bigram_matrix(ENGLISH_STOP_WORDS)
     vectorizer = CountVectorizer(ngram_range=(2, 2), stop_words='english')
-    bigrams_matrix = vectorizer.fit_transform(reviews)
-    bigrams = vectorizer.get_feature_names_out()
-    counts = bigrams_matrix.toarray().sum(axis=0)
-    bigrams_df = pd.DataFrame({'bigram': bigrams, 'count': counts})
-    return bigrams_df.sort_values(by='count', ascending=False).head(n)
+    try:
+        bigrams_matrix = vectorizer.fit_transform(reviews)
+    except ValueError:
+        # No bigrams survive stop-word removal
+        return sparse.csr_matrix((len(reviews), 0), dtype=np.int64), lambda indices: np.array([], dtype=object)
+    feature_names = vectorizer.get_feature_names_out()
+    return bigrams_matrix.tocsr(), lambda indices: feature_names[indices]
+
+# Function to extract top bigrams (column sums stay sparse; memory grows with non-zeros, not reviews x vocabulary)
+def extract_top_bigrams(reviews, n=10):
+    bigrams_matrix, bigram_names = _bigram_matrix(reviews)
+    counts = np.asarray(bigrams_matrix.sum(axis=0)).ravel()
+    return _top_ngrams(counts, bigram_names, n)
+
+# Function to extract positive, negative and overall top bigrams from a single vectorizer pass
+def extract_top_bigrams_by_sentiment(reviews, sentiment_scores, n=10, threshold=0.05):
+    from scipy import sparse
+    bigrams_matrix, bigram_names = _bigram_matrix(reviews)
+    scores = np.asarray(sentiment_scores, dtype=np.float64)
+    # One sparse product sums the rows of each sentiment group without slicing the matrix
+    groups = np.vstack([scores > threshold, scores < -threshold, np.ones(len(scores), dtype=bool)])
+    counts = (sparse.csr_matrix(groups.astype(np.int64)) @ bigrams_matrix).toarray()
+    return {
+        name: _top_ngrams(counts[i], bigram_names, n)
+        for i, name in enumerate(["positive", "negative", "overall"])
+    }
 
 # Function to plot bigrams
 def plot_bigrams(bigrams_df, title, save_path):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.barh(bigrams_df['bigram'], bigrams_df['count'], color='skyblue', edgecolor='black')
     plt.title(title, fontsize=16)
@@ -66,20 +477,31 @@ def plot_bigrams(bigrams_df, title, save_path):
     plt.savefig(save_path)
     plt.close()
 
-# Function to generate word clouds with optional colormap
+# Words drawn per word cloud (WordCloud's default), so stored counts only need their top rows read
+WORDCLOUD_MAX_WORDS = 200
+
+# Function to generate word clouds with optional colormap (texts are counted once, then drawn from the counts)
 def generate_wordcloud(reviews, title, save_path, colormap='viridis'):
-    text = " ".join(reviews)
-    wordcloud = WordCloud(width=800, height=400, background_color='white', colormap=colormap).generate(text)
-    plt.figure(figsize=(10, 6))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.title(title, fontsize=16)
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig(save_path)
-    plt.close()
+    frequencies = tokenize_reviews(reviews).term_frequencies(stop_words=get_wordcloud_stopwords())
+    generate_wordcloud_from_frequencies(frequencies, title, save_path, colormap)
+
+# Function to generate a word cloud from precomputed word counts (see TokenizedReviews.term_frequencies).
+# The image is saved straight from WordCloud, without a matplotlib figure (the title is no longer drawn on it).
+def generate_wordcloud_from_frequencies(frequencies, title, save_path, colormap='viridis'):
+    from wordcloud import WordCloud
+    wordcloud = WordCloud(
+        width=800, height=400, background_color='white', colormap=colormap, max_words=WORDCLOUD_MAX_WORDS
+    )
+    if frequencies:
+        image = wordcloud.generate_from_frequencies(frequencies).to_image()
+    else:
+        from PIL import Image
+        image = Image.new("RGB", (wordcloud.width, wordcloud.height), wordcloud.background_color)
+    image.save(save_path)
 
 # Plot Sentiment Over Time
 def plot_sentiment_over_time(reviews_df, save_path):
+    import matplotlib.pyplot as plt
     reviews_df = reviews_df.dropna(subset=["date_of_review"])
     reviews_df["date_of_review"] = pd.to_datetime(reviews_df["date_of_review"])
     sentiment_over_time = reviews_df.groupby("date_of_review")["sentiment_score"].mean()
@@ -94,6 +516,7 @@ def plot_sentiment_over_time(reviews_df, save_path):
 
 # Plot Star Ratings Distribution
 def plot_star_distribution(reviews_df, save_path):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     reviews_df["score"].value_counts().sort_index().plot(kind="bar", color="orange", edgecolor="black")
     plt.title("Star Ratings Distribution")
@@ -106,6 +529,7 @@ def plot_star_distribution(reviews_df, save_path):
 
 # Plot Aspect-Based Sentiment
 def plot_aspect_sentiment(aspect_sentiments, save_path):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     aspects = list(aspect_sentiments.keys())
     scores = list(aspect_sentiments.values())
@@ -114,4 +538,118 @@ def plot_aspect_sentiment(aspect_sentiments, save_path):
     plt.ylabel("Average Sentiment Score")
     plt.tight_layout()
     plt.savefig(save_path)
-    plt.close()
\ No newline at end of file
+    plt.close()
+
+# Topic stage: an online LDA model per corpus (a place, or e.g. a cuisine), persisted between requests so
+# new reviews are folded in with partial_fit instead of refitting. TOPIC_TIME_BUDGET caps the fitting time;
+# the summary afterwards reads a fixed-size sample, so its cost does not grow with the place either.
+TOPIC_MODEL_DIR = os.environ.get("TOPIC_MODEL_DIR", os.path.join("data", "topic_models"))
+TOPIC_TIME_BUDGET = float(os.environ.get("TOPIC_TIME_BUDGET", "2.0"))
+TOPIC_COMPONENTS = 5
+TOPIC_MAX_FEATURES = 5000
+TOPIC_BATCH_SIZE = 256
+TOPIC_FIRST_FIT_PASSES = 5  # a new model makes up to this many passes over the corpus within the budget
+TOPIC_VOCABULARY_REVIEWS = 5000  # reviews sampled to build a new model's vocabulary
+TOPIC_SUMMARY_REVIEWS = 1000  # reviews sampled to measure topic shares and sentiment
+TOPIC_TOP_WORDS = 8
+
+# Function to get the file a corpus's topic model is kept in
+def topic_model_path(corpus, model_dir=TOPIC_MODEL_DIR):
+    return os.path.join(model_dir, hashlib.sha1(corpus.encode("utf-8")).hexdigest()[:16] + ".joblib")
+
+# Function to load a fitted topic model ({"vectorizer", "lda", "fitted_keys"}), or None if there is none
+def load_topic_model(path):
+    import joblib
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        logging.warning("Could not load topic model %s, refitting: %s", path, e)
+        return None
+
+# Function to save a topic model atomically, so concurrent analyses never read a half-written file
+def save_topic_model(model, path):
+    import joblib
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    joblib.dump(model, temp_path)
+    os.replace(temp_path, path)
+
+def _topic_sample(n, size, seed=42):
+    if n <= size:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size, replace=False))
+
+# Function to fit a new topic model, or fold the reviews it has not seen into an existing one with online
+# partial_fit, in mini-batches until the deadline (a new model always fits at least one batch).
+# Raises ValueError when the reviews leave no vocabulary.
+def update_topic_model(model, keys, texts, deadline, n_components=TOPIC_COMPONENTS,
+                       max_features=TOPIC_MAX_FEATURES, batch_size=TOPIC_BATCH_SIZE):
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+    passes = 1
+    if model is None:
+        vectorizer = CountVectorizer(max_features=max_features, stop_words="english")
+        vectorizer.fit([texts[i] for i in _topic_sample(len(texts), TOPIC_VOCABULARY_REVIEWS)])
+        lda = LatentDirichletAllocation(
+            n_components=n_components, learning_method="online", total_samples=len(texts), random_state=42
+        )
+        model = {"vectorizer": vectorizer, "lda": lda, "fitted_keys": set()}
+        passes = TOPIC_FIRST_FIT_PASSES
+
+    pending = [i for i, key in enumerate(keys) if key not in model["fitted_keys"]]
+    for _ in range(passes):
+        for start in range(0, len(pending), batch_size):
+            if model["fitted_keys"] and time.perf_counter() > deadline:
+                return model
+            batch = pending[start:start + batch_size]
+            model["lda"].partial_fit(model["vectorizer"].transform([texts[i] for i in batch]))
+            model["fitted_keys"].update(keys[i] for i in batch)
+    return model
+
+# Function to describe each topic by its top words, its share of the reviews and the mean sentiment of
+# the reviews weighted by how much they belong to it (from a sample of the reviews)
+def summarize_topics(model, texts, sentiment_scores, top_words=TOPIC_TOP_WORDS):
+    vectorizer, lda = model["vectorizer"], model["lda"]
+    sample = _topic_sample(len(texts), TOPIC_SUMMARY_REVIEWS)
+    counts = vectorizer.transform([texts[i] for i in sample])
+    # Reviews with no vocabulary words would spread evenly over every topic
+    has_words = np.asarray(counts.sum(axis=1)).ravel() > 0
+    doc_topics = lda.transform(counts[has_words])
+    sentiment = np.asarray(sentiment_scores, dtype=np.float64)[sample][has_words]
+    scored = ~np.isnan(sentiment)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        topic_sentiment = doc_topics[scored].T @ sentiment[scored] / doc_topics[scored].sum(axis=0)
+        share = doc_topics.sum(axis=0) / doc_topics.sum()
+
+    words = vectorizer.get_feature_names_out()
+    top = np.argsort(lda.components_, axis=1)[:, ::-1][:, :top_words]
+    return pd.DataFrame({
+        "topic": np.arange(1, lda.n_components + 1),
+        "top_words": [", ".join(words[row]) for row in top],
+        "share": share,
+        "sentiment": topic_sentiment,
+    })
+
+# Function to run the topic stage for one corpus: load its model, fold in new reviews within the time
+# budget, save it, and summarise the topics. keys and texts are indexed one review at a time, so TextColumns
+# are read without decoding every review. Returns None when there is too little text for topics.
+def run_topic_stage(corpus, keys, texts, sentiment_scores, time_budget=TOPIC_TIME_BUDGET,
+                    model_dir=TOPIC_MODEL_DIR):
+    deadline = time.perf_counter() + time_budget
+    path = topic_model_path(corpus, model_dir)
+    model = load_topic_model(path)
+    fitted_before = len(model["fitted_keys"]) if model else 0
+    try:
+        model = update_topic_model(model, keys, texts, deadline)
+    except ValueError as e:
+        logging.info("No topics for %s: %s", corpus, e)
+        return None
+    fitted = len(model["fitted_keys"]) - fitted_before
+    if fitted:
+        save_topic_model(model, path)
+    unfitted = len(keys) - len(model["fitted_keys"].intersection(keys))
+    if unfitted:
+        logging.info("Topic model for %s: time budget reached, %d reviews left for the next run", corpus, unfitted)
+    return summarize_topics(model, texts, sentiment_scores)
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", "3600"))
+# How long past the TTL a stale result may still be served while it is refreshed (0 disables)
+RESULT_CACHE_STALE_TTL = int(os.environ.get("RESULT_CACHE_STALE_TTL", "86400"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Function to build the cache key of an analysis: the canonical place ID plus the options that change the result
+def result_cache_key(place_id, max_reviews=None, since_date=None):
+    key = place_id
+    if max_reviews:
+        key += f"|max_reviews={max_reviews}"
+    if since_date is not None:
+        key += f"|since={since_date.isoformat()}"
+    return key
+
+# In-memory cache of finished analyses (verdict, metrics and chart references) by place, with a TTL,
+# a stale-while-revalidate window and LRU eviction by the size of the cached results
+class ResultCache:
+    def __init__(self, ttl=RESULT_CACHE_TTL, stale_ttl=RESULT_CACHE_STALE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    # Cached result and its state ("fresh" or "stale"), or (None, "miss")
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, "miss"
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl:
+                state = "fresh"
+            elif age < self.ttl + self.stale_ttl:
+                state = "stale"
+            else:
+                self._drop(key)
+                return None, "miss"
+            self._entries.move_to_end(key)
+            return entry["result"], state
+
+    def put(self, key, result):
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            logging.warning("Result for %s is larger than the whole result cache; not caching it", key)
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {"result": result, "stored_at": time.time(), "size": size}
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+                logging.info("Evicted cached result for %s", oldest)
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    # Drop every entry whose result matches predicate(result); returns how many were dropped
+    def invalidate_where(self, predicate):
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if predicate(entry["result"])]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    # Caller holds the lock
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)["size"]
+
+    # Claim the background refresh of a key; False if one is already running
+    def begin_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "refreshing": len(self._refreshing),
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,120 @@
+from array import array
+import numpy as np
+import pandas as pd
+
+# datetime64 stores NaT as the smallest int64, so missing dates can be collected as plain integers
+NAT_DAYS = np.iinfo(np.int64).min
+
+# Strings packed into one UTF-8 buffer, addressed by per-string start/end byte offsets.
+# Selecting strings only gathers offsets; the buffer is shared, never copied.
+class TextColumn:
+    __slots__ = ("buffer", "starts", "ends")
+
+    def __init__(self, buffer, starts, ends):
+        self.buffer = buffer
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_strings(cls, strings):
+        buffer = bytearray()
+        ends = array("q")
+        for text in strings:
+            if isinstance(text, str):
+                buffer += text.encode("utf-8")
+            ends.append(len(buffer))
+        return _text_column(buffer, ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return self.buffer[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    def __iter__(self):
+        buffer = self.buffer
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            yield buffer[start:end].decode("utf-8")
+
+    # Strings at `index` (positions or a boolean mask), sharing this column's buffer
+    def take(self, index):
+        return TextColumn(self.buffer, self.starts[index], self.ends[index])
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) + self.starts.nbytes + self.ends.nbytes
+
+# Reviews of one place in typed columns: int8 stars, datetime64[D] review dates, float32 compound sentiment,
+# and review keys and texts in shared UTF-8 buffers. About 13 bytes per review plus the text itself,
+# against a few hundred bytes of Python objects per row in a DataFrame.
+class ReviewColumns:
+    __slots__ = ("keys", "texts", "stars", "dates", "sentiment")
+
+    def __init__(self, keys, texts, stars, dates, sentiment):
+        self.keys = keys
+        self.texts = texts
+        self.stars = stars
+        self.dates = dates
+        self.sentiment = sentiment
+
+    # Build from (review_key, review, score, days since 1970-01-01 or None, sentiment or None) tuples,
+    # e.g. straight off a database cursor, without an intermediate list of rows
+    @classmethod
+    def from_records(cls, records):
+        keys, texts = bytearray(), bytearray()
+        key_ends, text_ends = array("q"), array("q")
+        stars, days, sentiment = array("b"), array("q"), array("f")
+        for key, text, score, day, score_sentiment in records:
+            keys += key.encode("utf-8")
+            key_ends.append(len(keys))
+            if text:
+                texts += text.encode("utf-8")
+            text_ends.append(len(texts))
+            stars.append(int(score))
+            days.append(NAT_DAYS if day is None else int(day))
+            sentiment.append(float("nan") if score_sentiment is None else score_sentiment)
+        return cls(
+            _text_column(keys, key_ends), _text_column(texts, text_ends),
+            _numpy(stars, np.int8), _numpy(days, np.int64).view("datetime64[D]"), _numpy(sentiment, np.float32),
+        )
+
+    # Build from a DataFrame with the review store's columns (review_key, review, score, date_of_review,
+    # sentiment_score)
+    @classmethod
+    def from_frame(cls, reviews_df):
+        dates = pd.to_datetime(reviews_df["date_of_review"], errors="coerce").to_numpy().astype("datetime64[D]")
+        return cls(
+            TextColumn.from_strings(reviews_df["review_key"]),
+            TextColumn.from_strings(reviews_df["review"]),
+            reviews_df["score"].to_numpy(dtype=np.int8),
+            dates,
+            reviews_df["sentiment_score"].to_numpy(dtype=np.float32),
+        )
+
+    def __len__(self):
+        return len(self.stars)
+
+    # Reviews at `index` (positions or a boolean mask); the key and text buffers are shared
+    def select(self, index):
+        return ReviewColumns(
+            self.keys.take(index), self.texts.take(index),
+            self.stars[index], self.dates[index], self.sentiment[index],
+        )
+
+    # Calendar month of every review, as datetime64[M]
+    def months(self):
+        return self.dates.astype("datetime64[M]")
+
+    @property
+    def nbytes(self):
+        return (
+            self.keys.nbytes + self.texts.nbytes + self.stars.nbytes + self.dates.nbytes + self.sentiment.nbytes
+        )
+
+def _numpy(values, dtype):
+    return np.frombuffer(values, dtype=dtype) if len(values) else np.zeros(0, dtype=dtype)
+
+def _text_column(buffer, ends):
+    ends = _numpy(ends, np.int64)
+    starts = np.concatenate([np.zeros(1, dtype=np.int64), ends[:-1]]) if len(ends) else ends
+    return TextColumn(buffer, starts, ends)
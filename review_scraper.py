@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, asdict
+import pandas as pd
+from restaurant_engine_functions import parse_review_dates
+# Selenium is imported by the functions that drive the browser, so importing this module stays cheap
+
+REVIEWS_CONTAINER_XPATH = '//div[contains(@class, "m6QErb") and contains(@class, "DxyBCb")]'
+REVIEW_CARD_SELECTOR = 'div.jftiEf[data-review-id]'
+
+# Function to build a stable key for a review: the Maps review ID when there is one, else a content hash
+# (the relative date string changes over time, so it is left out)
+def make_review_key(review, score, review_id=None):
+    if review_id:
+        return review_id
+    return hashlib.sha1(f"{score}|{review}".encode("utf-8")).hexdigest()
+
+# Function to start a headless Chrome session, optionally on a persistent profile
+def create_driver(profile_dir=None):
+    from selenium import webdriver
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    return webdriver.Chrome(options=options)
+
+# Function to click away the cookie-consent dialog
+def accept_cookies(driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    try:
+        accept_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, '//button[contains(@class, "UywwFc-LgbsSe")]'))
+        )
+        accept_button.click()
+    except Exception:
+        logging.warning("Cookies acceptance button not found or already accepted.")
+    driver.cookies_accepted = True
+
+# Function to sort the review panel newest first, so incremental scrapes can stop at known reviews
+def sort_reviews_by_newest(driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    try:
+        sort_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, '//button[@aria-label="Sort reviews" or @data-value="Sort"]'))
+        )
+        sort_button.click()
+        newest_option = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, '//div[@role="menuitemradio" and contains(., "Newest")]'))
+        )
+        newest_option.click()
+        return True
+    except Exception:
+        logging.warning("Could not sort reviews by newest; scrolling through every review instead.")
+        return False
+
+# Function to locate the scrollable reviews container
+def find_reviews_container(driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    try:
+        return WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, REVIEWS_CONTAINER_XPATH))
+        )
+    except Exception as e:
+        raise RuntimeError(f"Failed to locate reviews container: {str(e)}")
+
+# Script that reads every review card from position `start` on in one round-trip, returned as JSON.
+# Fields are read per card, so a review without text keeps its own stars and date.
+EXTRACT_REVIEWS_JS = """
+const [container, start, selector] = arguments;
+const cards = container.querySelectorAll(selector);
+const rows = [];
+for (let i = start; i < cards.length; i++) {
+    const card = cards[i];
+    const text = card.querySelector('span.wiI7pd');
+    const stars = card.querySelector('span.kvMYJc');
+    const date = card.querySelector('span.rsqaWe');
+    rows.push({
+        review_id: card.getAttribute('data-review-id'),
+        review: text ? text.innerText : '',
+        stars: stars ? stars.getAttribute('aria-label') : null,
+        date: date ? date.innerText : ''
+    });
+}
+return JSON.stringify(rows);
+"""
+
+# Script that scrolls the panel, then resolves as soon as more review cards appear (or the wait times out)
+WAIT_FOR_MORE_REVIEWS_JS = """
+const [container, selector, previous, timeoutMs, done] = arguments;
+const count = () => container.querySelectorAll(selector).length;
+container.scrollTop = container.scrollHeight;
+if (count() > previous) { done(count()); return; }
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (count() > previous) { observer.disconnect(); clearTimeout(timer); done(count()); }
+});
+observer.observe(container, {childList: true, subtree: true});
+timer = setTimeout(() => { observer.disconnect(); done(count()); }, timeoutMs);
+"""
+
+# Timing figures for one scrape, used to tune the scroll loop. scroll_time is the whole crawl (including
+# time the caller spends on each batch); the other times cover browser work only.
+@dataclass
+class ScrapeMetrics:
+    pages_loaded: int = 0
+    reviews_loaded: int = 0
+    idle_rounds: int = 0
+    idle_time: float = 0.0
+    scroll_time: float = 0.0
+    driver_wait: float = 0.0
+    page_time: float = 0.0
+    load_time: float = 0.0
+    extract_time: float = 0.0
+    stop_reason: str = ""
+
+    @property
+    def reviews_per_sec(self):
+        return self.reviews_loaded / self.scroll_time if self.scroll_time else 0.0
+
+    # Browser-side pipeline stages, in seconds
+    def stage_times(self):
+        return {
+            "driver_wait": self.driver_wait,
+            "page_open": self.page_time,
+            "scroll": self.load_time,
+            "extract": self.extract_time,
+        }
+
+    def as_dict(self):
+        return {**asdict(self), "reviews_per_sec": round(self.reviews_per_sec, 2)}
+
+# Function to pull the loaded reviews (from card `start` on) out of the page in a single script call
+def extract_reviews(driver, scrollable_div, start=0):
+    cards = json.loads(driver.execute_script(EXTRACT_REVIEWS_JS, scrollable_div, start, REVIEW_CARD_SELECTOR))
+    reviews_data = []
+    for card in cards:
+        try:
+            score = int(card["stars"].split()[0])
+        except (AttributeError, IndexError, ValueError):
+            logging.error("Error parsing stars of review %s: %r", card["review_id"], card["stars"])
+            continue
+        reviews_data.append({
+            "review_key": make_review_key(card["review"], score, card["review_id"]),
+            "review": card["review"],
+            "score": score,
+            "date": card["date"]
+        })
+    return reviews_data
+
+# Generator that scrolls the review panel and yields each newly loaded batch of (not yet stored) reviews,
+# until no more reviews load or a stop condition is met. Each round waits on a MutationObserver instead
+# of a fixed sleep; idle waits back off exponentially. Timing figures are collected into `metrics`.
+# The known-reviews and since_date stops assume the panel is sorted newest first; pass newest_first=False
+# when it is not, and the whole panel is scrolled. The known-reviews stop also assumes every review older
+# than the known ones is stored; pass stop_at_known=False when that is not recorded, and known cards are
+# skipped while the scroll goes on.
+def iter_review_batches(driver, scrollable_div, known_keys=None, max_reviews=None, since_date=None, metrics=None,
+                        max_retries=5, initial_wait=0.25, max_wait=4.0, newest_first=True, stop_at_known=True):
+    metrics = metrics if metrics is not None else ScrapeMetrics()
+    known_keys = known_keys or set()
+    driver.set_script_timeout(max_wait + 10)
+    started = time.perf_counter()
+    seen = set()
+    count = 0
+    wait = initial_wait
+    retry_count = 0
+    try:
+        while True:
+            round_started = time.perf_counter()
+            new_count = driver.execute_async_script(
+                WAIT_FOR_MORE_REVIEWS_JS, scrollable_div, REVIEW_CARD_SELECTOR, count, int(wait * 1000)
+            )
+            metrics.load_time += time.perf_counter() - round_started
+            if new_count <= count:
+                metrics.idle_rounds += 1
+                metrics.idle_time += time.perf_counter() - round_started
+                retry_count += 1
+                if retry_count >= max_retries:
+                    metrics.stop_reason = "exhausted"
+                    return
+                wait = min(wait * 2, max_wait)
+                continue
+            retry_count = 0
+            metrics.pages_loaded += 1
+            wait = initial_wait
+
+            extract_started = time.perf_counter()
+            loaded = [row for row in extract_reviews(driver, scrollable_div, start=count) if row["review_key"] not in seen]
+            metrics.extract_time += time.perf_counter() - extract_started
+            count = new_count
+            if max_reviews:
+                loaded = loaded[:max(max_reviews - len(seen), 0)]
+            seen.update(row["review_key"] for row in loaded)
+            metrics.reviews_loaded = len(seen)
+            batch = [row for row in loaded if row["review_key"] not in known_keys]
+            if batch:
+                yield batch
+
+            if max_reviews and len(seen) >= max_reviews:
+                metrics.stop_reason = "max_reviews"
+                return
+            if not newest_first:
+                continue
+            if since_date is not None and loaded:
+                # Parsed like the stored dates, so "Edited 3 months ago" is three months back, not today
+                last_date = parse_review_dates([loaded[-1]["date"]])[0].iloc[0]
+                if not pd.isna(last_date) and last_date.date() < since_date:
+                    metrics.stop_reason = "since_date"
+                    return
+            if stop_at_known and known_keys and loaded and not batch:
+                # A newly loaded page made up entirely of reviews we already stored
+                metrics.stop_reason = "known_reviews"
+                return
+    finally:
+        metrics.scroll_time = time.perf_counter() - started
+
+# Function to open the reviews page on a driver and yield review batches as they load
+def _review_batches_with_driver(driver, url, known_keys, max_reviews, since_date, metrics, stop_at_known):
+    started = time.perf_counter()
+    driver.get(url)
+    if not getattr(driver, "cookies_accepted", False):
+        accept_cookies(driver)
+    # Stopping early at known or old reviews is only safe when the panel really is newest first
+    newest_first = False
+    if (known_keys and stop_at_known) or since_date is not None:
+        newest_first = sort_reviews_by_newest(driver)
+    scrollable_div = find_reviews_container(driver)
+    metrics.page_time = time.perf_counter() - started
+    yield from iter_review_batches(
+        driver, scrollable_div, known_keys=known_keys, max_reviews=max_reviews, since_date=since_date,
+        metrics=metrics, newest_first=newest_first, stop_at_known=stop_at_known
+    )
+
+# Generator that scrapes a Google Maps reviews URL batch by batch, skipping reviews in `known_keys`
+# (stopping at the first page of them only with stop_at_known, see iter_review_batches).
+# The driver (pooled or private) is held until the generator finishes or is closed.
+def scrape_review_batches(url, known_keys=None, pool=None, max_reviews=None, since_date=None, metrics=None,
+                          stop_at_known=True):
+    metrics = metrics if metrics is not None else ScrapeMetrics()
+    if pool is not None:
+        started = time.perf_counter()
+        with pool.session() as driver:
+            metrics.driver_wait = time.perf_counter() - started
+            yield from _review_batches_with_driver(
+                driver, url, known_keys, max_reviews, since_date, metrics, stop_at_known
+            )
+    else:
+        started = time.perf_counter()
+        driver = create_driver()
+        metrics.driver_wait = time.perf_counter() - started
+        try:
+            yield from _review_batches_with_driver(
+                driver, url, known_keys, max_reviews, since_date, metrics, stop_at_known
+            )
+        finally:
+            driver.quit()
+    logging.info("Scrape metrics: %s", metrics.as_dict())
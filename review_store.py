@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from review_columns import ReviewColumns
+from monthly_rollup import ROLLUP_COLUMNS, rollup_cells
+from restaurant_engine_functions import (
+    aspect_sentence_sentiment, tag_aspects, tokenize_reviews, ASPECT_LEXICON, WORDCLOUD_MAX_WORDS
+)
+
+DEFAULT_STORE_PATH = os.environ.get("REVIEW_STORE_PATH", os.path.join("data", "reviews.db"))
+
+REVIEW_COLUMNS = ["review_key", "review", "score", "date", "date_of_review", "sentiment_score"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY,
+    name TEXT,
+    url TEXT,
+    last_scraped TEXT,
+    crawl_complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    place_id TEXT NOT NULL,
+    review_key TEXT NOT NULL,
+    review TEXT,
+    score INTEGER,
+    date TEXT,
+    date_of_review TEXT,
+    sentiment_score REAL,
+    scraped_at TEXT,
+    PRIMARY KEY (place_id, review_key)
+);
+CREATE TABLE IF NOT EXISTS monthly_rollup (
+    place_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    reviews INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    sentiment_sum REAL NOT NULL,
+    sentiment_squares REAL NOT NULL,
+    sentences INTEGER NOT NULL,
+    sentence_sum REAL NOT NULL,
+    PRIMARY KEY (place_id, month, group_key)
+);
+CREATE TABLE IF NOT EXISTS word_counts (
+    place_id TEXT NOT NULL,
+    polarity TEXT NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (place_id, polarity, word)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    place_id TEXT PRIMARY KEY,
+    lexicon TEXT NOT NULL
+);
+"""
+
+# Bump when the per-place aggregates gain a table or change meaning, so existing places are rebuilt
+AGGREGATES_VERSION = 1
+
+# Function to fingerprint an aspect lexicon (and the aggregate layout), so aggregates built with a
+# different one are rebuilt
+def lexicon_fingerprint(lexicon):
+    payload = json.dumps([AGGREGATES_VERSION, lexicon], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+# Local SQLite store of scraped reviews, keyed by Google Maps place ID, with per-place aggregates that are
+# updated as reviews are added: a monthly rollup (see monthly_rollup) and word counts for the word clouds
+class ReviewStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, aspect_lexicon=ASPECT_LEXICON):
+        self.path = path
+        self.aspect_lexicon = aspect_lexicon
+        self.lexicon = lexicon_fingerprint(aspect_lexicon)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Merge newly scraped (already scored and dated) reviews into the store and fold the ones that were
+    # not stored yet into the aggregates; returns rows added
+    def save_reviews(self, place_id, reviews_df, name=None, url=None):
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (
+                place_id, row.review_key, row.review, int(row.score), row.date,
+                None if pd.isna(row.date_of_review) else pd.Timestamp(row.date_of_review).date().isoformat(),
+                None if pd.isna(row.sentiment_score) else float(row.sentiment_score),
+                now,
+            )
+            for row in reviews_df[REVIEW_COLUMNS].itertuples(index=False)
+        ]
+        # Aggregate the reviews that are not stored yet before taking the write lock (VADER runs on their
+        # aspect sentences), so the transaction only holds the inserts and upserts
+        with closing(self._connect()) as conn:
+            current = self._aggregates_current(conn, place_id)
+            stored_keys = self._stored_keys(conn, place_id, [row[1] for row in rows])
+        candidates = [i for i, row in enumerate(rows) if row[1] not in stored_keys]
+        aggregates = self._compute_aggregates(reviews_df.iloc[candidates]) if current else None
+        with closing(self._connect()) as conn, conn:
+            # Row by row, to know which reviews are new (the rollup must count each review once)
+            new_rows = [
+                i for i, row in enumerate(rows)
+                if conn.execute("INSERT OR IGNORE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row).rowcount
+            ]
+            added = len(new_rows)
+            current = self._aggregates_current(conn, place_id)
+            if current:
+                if aggregates is None or new_rows != candidates:
+                    # Another writer stored some of these reviews, or rebuilt the aggregates, meanwhile
+                    aggregates = self._compute_aggregates(reviews_df.iloc[new_rows])
+                self._write_aggregates(conn, place_id, aggregates)
+            conn.execute(
+                "INSERT INTO places (place_id, name, url, last_scraped) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(place_id) DO UPDATE SET name = COALESCE(excluded.name, name), "
+                "url = COALESCE(excluded.url, url), last_scraped = excluded.last_scraped",
+                (place_id, name, url, now),
+            )
+        if not current:
+            self._rebuild_aggregates(place_id)
+        logging.info("Stored %d new reviews for %s", added, place_id)
+        return added
+
+    # Which of `keys` are already stored for a place (looked up in chunks, within SQLite's variable limit)
+    def _stored_keys(self, conn, place_id, keys, chunk_size=500):
+        stored = set()
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            rows = conn.execute(
+                f"SELECT review_key FROM reviews WHERE place_id = ? AND review_key IN ({', '.join('?' * len(chunk))})",
+                (place_id, *chunk),
+            )
+            stored.update(row[0] for row in rows)
+        return stored
+
+    # Whether the place's last crawl scrolled to the end of its reviews panel, i.e. every review older than
+    # the newest stored one is stored, so a crawl may stop at the first page of known reviews
+    def crawl_complete(self, place_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT crawl_complete FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return bool(row and row[0])
+
+    def set_crawl_complete(self, place_id, complete):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO places (place_id, crawl_complete) VALUES (?, ?) "
+                "ON CONFLICT(place_id) DO UPDATE SET crawl_complete = excluded.crawl_complete",
+                (place_id, int(complete)),
+            )
+
+    # All stored reviews for a place as compact ReviewColumns, streamed from the cursor
+    # (dates arrive as days since 1970-01-01)
+    def load_review_columns(self, place_id):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT review_key, review, score, CAST(julianday(date_of_review) - 2440587.5 AS INTEGER), "
+                "sentiment_score FROM reviews WHERE place_id = ?",
+                (place_id,),
+            )
+            return ReviewColumns.from_records(rows)
+
+    # Every stored review as one ReviewColumns, grouped by place: returns the place IDs, each review's
+    # position in that list, and the columns (read in one transaction so the two queries agree)
+    def load_all_review_columns(self):
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            places = conn.execute(
+                "SELECT place_id, COUNT(*) FROM reviews GROUP BY place_id ORDER BY place_id"
+            ).fetchall()
+            rows = conn.execute(
+                "SELECT review_key, review, score, CAST(julianday(date_of_review) - 2440587.5 AS INTEGER), "
+                "sentiment_score FROM reviews ORDER BY place_id"
+            )
+            reviews = ReviewColumns.from_records(rows)
+            conn.rollback()
+        place_ids = [place_id for place_id, _ in places]
+        place_index = np.repeat(np.arange(len(places)), [count for _, count in places])
+        return place_ids, place_index, reviews
+
+    # Monthly rollup cells of a place (ROLLUP_COLUMNS)
+    def load_monthly_rollup(self, place_id):
+        self._ensure_aggregates(place_id)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM monthly_rollup WHERE place_id = ?",
+                conn, params=(place_id,),
+            )
+
+    # Monthly rollup cells of every stored place (a place_id column and ROLLUP_COLUMNS)
+    def load_all_monthly_rollups(self):
+        with closing(self._connect()) as conn:
+            place_ids = [row[0] for row in conn.execute("SELECT DISTINCT place_id FROM reviews")]
+        for place_id in place_ids:
+            self._ensure_aggregates(place_id)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT place_id, {', '.join(ROLLUP_COLUMNS)} FROM monthly_rollup ORDER BY place_id", conn
+            )
+
+    # Word counts of a place's positive or negative reviews, minus stop words: only the top max_words rows
+    # are read, which is all a word cloud draws
+    def load_word_frequencies(self, place_id, polarity, stop_words=(), max_words=WORDCLOUD_MAX_WORDS):
+        self._ensure_aggregates(place_id)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT word, count FROM word_counts WHERE place_id = ? AND polarity = ? "
+                "ORDER BY count DESC LIMIT ?",
+                (place_id, polarity, max_words + len(stop_words)),
+            )
+            frequencies = {word: count for word, count in rows if word not in stop_words}
+        return dict(list(frequencies.items())[:max_words])
+
+    # Build a place's aggregates from its stored reviews the first time they are needed, or after the
+    # aspect lexicon or the aggregate layout changed
+    def _ensure_aggregates(self, place_id):
+        with closing(self._connect()) as conn:
+            current = self._aggregates_current(conn, place_id)
+        if not current:
+            self._rebuild_aggregates(place_id)
+
+    def _aggregates_current(self, conn, place_id):
+        row = conn.execute("SELECT lexicon FROM rollup_state WHERE place_id = ?", (place_id,)).fetchone()
+        return row is not None and row[0] == self.lexicon
+
+    # Aggregate reviews into monthly rollup cells and per-polarity word counts, without touching the store
+    # (undated reviews are left out of both, as they are left out of every analysis). Aspect sentences are
+    # scored here, once per stored review, so analyses read their sentiment from the rollup instead.
+    def _compute_aggregates(self, reviews_df):
+        if reviews_df.empty:
+            return None
+        dates = pd.to_datetime(reviews_df["date_of_review"], errors="coerce").to_numpy().astype("datetime64[D]")
+        sentiment = reviews_df["sentiment_score"].to_numpy(dtype=np.float64)
+        # Tokenised once: aspect tagging and the word counts both read these tokens
+        tokens = tokenize_reviews(reviews_df["review"].tolist())
+        aspect_matrix, aspects = tag_aspects(tokens, self.aspect_lexicon)
+        dated = ~np.isnat(dates)
+        sentence_counts, sentence_sums = aspect_sentence_sentiment(
+            tokens.texts, aspect_matrix.multiply(dated[:, None]).tocsr(), self.aspect_lexicon
+        )
+        cells = rollup_cells(
+            dates, reviews_df["score"].to_numpy(), sentiment, aspect_matrix, aspects, sentence_counts, sentence_sums
+        )
+        # Stop words are kept here and dropped on read, so the counts do not depend on the stop-word list
+        word_counts = {
+            polarity: tokens.term_frequencies(review_mask)
+            for polarity, review_mask in (("positive", dated & (sentiment > 0)), ("negative", dated & (sentiment < 0)))
+        }
+        return cells, word_counts
+
+    # Fold computed aggregates into the monthly rollup and the word counts (caller commits)
+    def _write_aggregates(self, conn, place_id, aggregates):
+        if aggregates is None:
+            return
+        cells, word_counts = aggregates
+        conn.executemany(
+            f"INSERT INTO monthly_rollup (place_id, {', '.join(ROLLUP_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(place_id, month, group_key) DO UPDATE SET reviews = reviews + excluded.reviews, "
+            "scored = scored + excluded.scored, sentiment_sum = sentiment_sum + excluded.sentiment_sum, "
+            "sentiment_squares = sentiment_squares + excluded.sentiment_squares, "
+            "sentences = sentences + excluded.sentences, sentence_sum = sentence_sum + excluded.sentence_sum",
+            [
+                (place_id, row.month, row.group_key, int(row.reviews), int(row.scored),
+                 float(row.sentiment_sum), float(row.sentiment_squares), int(row.sentences), float(row.sentence_sum))
+                for row in cells.itertuples(index=False)
+            ],
+        )
+        for polarity, counts in word_counts.items():
+            conn.executemany(
+                "INSERT INTO word_counts VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(place_id, polarity, word) DO UPDATE SET count = count + excluded.count",
+                [(place_id, polarity, word, count) for word, count in counts.items()],
+            )
+
+    # Recompute a place's aggregates from all of its stored reviews. The reviews are read and aggregated
+    # outside the write transaction; if reviews were stored meanwhile (reviews are only ever added, so the
+    # count tells), the rebuild starts over.
+    def _rebuild_aggregates(self, place_id):
+        while True:
+            with closing(self._connect()) as conn:
+                reviews_df = pd.read_sql_query(
+                    "SELECT review, score, date_of_review, sentiment_score FROM reviews WHERE place_id = ?",
+                    conn, params=(place_id,),
+                )
+            aggregates = self._compute_aggregates(reviews_df)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                stored = conn.execute("SELECT COUNT(*) FROM reviews WHERE place_id = ?", (place_id,)).fetchone()[0]
+                if stored == len(reviews_df):
+                    conn.execute("DELETE FROM monthly_rollup WHERE place_id = ?", (place_id,))
+                    conn.execute("DELETE FROM word_counts WHERE place_id = ?", (place_id,))
+                    self._write_aggregates(conn, place_id, aggregates)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rollup_state (place_id, lexicon) VALUES (?, ?)", (place_id, self.lexicon)
+                    )
+                    break
+            logging.info("Reviews of %s were added during the rebuild; rebuilding again", place_id)
+        logging.info("Rebuilt the monthly rollup and word counts of %s from %d reviews", place_id, len(reviews_df))
@@ -0,0 +1,26 @@
+import os
+from artifact_store import ArtifactStore
+from result_cache import ResultCache
+
+# Evicting a bundle drops the cached results whose chart URLs point into it
+def test_eviction_invalidates_cached_results(tmp_path):
+    cache = ResultCache()
+    store = ArtifactStore(root=str(tmp_path), max_bytes=150)
+
+    def invalidate(bundle):
+        prefix = store.url(bundle, "")
+        cache.invalidate_where(lambda result: any(url.startswith(prefix) for url in result["charts"].values()))
+    store.on_evict = invalidate
+
+    for bundle, mtime in (("old", 1000), ("new", 2000)):
+        staging = store.begin_bundle()
+        with open(os.path.join(staging, "bigrams.png"), "wb") as f:
+            f.write(b"x" * 100)
+        cache.put(bundle, {"charts": {"bigrams": store.url(bundle, "bigrams.png")}})
+        store.publish_bundle(bundle, staging, {})
+        os.utime(store.bundle_dir(bundle), (mtime, mtime))
+    store.evict()
+
+    assert not os.path.exists(store.bundle_dir("old"))
+    assert cache.get("old") == (None, "miss")
+    assert cache.get("new")[1] == "fresh"
@@ -0,0 +1,15 @@
+from batch_analysis import parse_batch_urls
+
+MAPS_URL = "https://www.google.com/maps/place/Foo+Bar/@38.7,-9.1,17z/data=!4m8!3m7!1s0x12:0x34!8m2"
+OTHER_URL = "https://www.google.com/maps/place/Baz/@38.71,-9.14,15z/data=!4m6!3m5!1s0x56:0x78"
+
+# Maps URLs carry commas in their @lat,lng,zoom segment; one URL per line must keep them whole
+def test_one_url_per_line_keeps_commas():
+    assert parse_batch_urls(f"{MAPS_URL}\n\n  {OTHER_URL}  \n{MAPS_URL}\n") == [MAPS_URL, OTHER_URL]
+
+def test_url_list_with_a_header_line():
+    assert parse_batch_urls(f"restaurants\n{MAPS_URL}\n") == [MAPS_URL]
+
+def test_csv_with_a_url_column():
+    text = f'name,url\nFoo Bar,"{MAPS_URL}"\nBaz,"{OTHER_URL}"\n'
+    assert parse_batch_urls(text) == [MAPS_URL, OTHER_URL]
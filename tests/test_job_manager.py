@@ -0,0 +1,35 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from job_manager import JobManager
+
+# Restaurants of a batch share the job limit with queued analyses, and count as running jobs
+def test_batch_children_share_the_job_limit():
+    manager = JobManager(max_workers=2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+    running_seen = []
+
+    def analyze(url, progress=None):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+            running_seen.append(manager.stats()["running"])
+        time.sleep(0.05)
+        with lock:
+            active.remove(url)
+        return url
+
+    def batch(urls, progress=None):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            return list(pool.map(lambda url: manager.run_child(analyze, url, description=url), urls))
+
+    batch_job = manager.submit(batch, [f"b{i}" for i in range(6)], holds_slot=False)
+    single_job = manager.submit(analyze, "single")
+    assert batch_job.future.result(timeout=5) == [f"b{i}" for i in range(6)]
+    assert single_job.future.result(timeout=5) == "single"
+    assert max(peak) <= 2
+    # The batch coordinator itself plus the children holding slots
+    assert max(running_seen) >= 2
+    assert manager.submitted == 8
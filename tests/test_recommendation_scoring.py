@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from monthly_rollup import rollup_cells, rollup_trend_slopes, trend_scores, TREND_MIN_REVIEWS
+from recommendation_scoring import review_features, score_restaurants, store_features, RunningReviewStats
+from restaurant_engine_functions import tag_aspects
+from review_store import ReviewStore
+
+REFERENCE_DATE = np.datetime64("2026-10-18")
+
+def reviews_by_month(months):
+    # months: [(first day of month, sentiment, reviews)]
+    dates, sentiment = [], []
+    for day, score, count in months:
+        dates += [np.datetime64(day)] * count
+        sentiment += [score] * count
+    return np.array(dates, dtype="datetime64[D]"), np.array(sentiment), np.full(len(dates), 5)
+
+def features_for(dates, sentiment, stars):
+    return review_features(
+        np.zeros(len(dates), dtype=np.int64), 1, sentiment, stars, dates,
+        rollup_cells(dates, stars, sentiment), reference_date=REFERENCE_DATE,
+    )
+
+# Two months of glowing five-star reviews used to yield trend_slope=-3.0 and "Do Not Recommend"
+def test_two_month_dip_does_not_sink_a_five_star_place():
+    dates, sentiment, stars = reviews_by_month([("2026-09-01", 0.85, 20), ("2026-10-01", 0.60, 20)])
+    features = features_for(dates, sentiment, stars)
+    assert features["trend_slope"].iloc[0] == 0
+    verdict = score_restaurants(features).iloc[0]
+    assert verdict["recommendation"] == "Must Go"
+
+def test_trend_is_bounded_and_signed():
+    dates, sentiment, stars = reviews_by_month(
+        [("2026-08-01", 0.9, 20), ("2026-09-01", 0.5, 20), ("2026-10-01", 0.1, 20)]
+    )
+    trend = features_for(dates, sentiment, stars)["trend_slope"].iloc[0]
+    assert -1 <= trend < 0
+    assert score_restaurants(features_for(dates, sentiment, stars))["score"].iloc[0] > -1
+
+def test_trend_needs_enough_reviews():
+    dates, sentiment, stars = reviews_by_month(
+        [("2026-08-01", 0.9, 5), ("2026-09-01", 0.5, 5), ("2026-10-01", 0.1, 5)]
+    )
+    assert 15 < TREND_MIN_REVIEWS
+    assert features_for(dates, sentiment, stars)["trend_slope"].iloc[0] == 0
+
+def test_months_are_weighted_by_review_count():
+    # One stray review in a low month barely moves a trend carried by busy months
+    busy = trend_scores(np.zeros(3), 1, np.array(["2026-08", "2026-09", "2026-10"], dtype="datetime64[M]"),
+                        np.array([30, 30, 1]), np.array([0.6 * 30, 0.6 * 30, -1.0]))
+    even = trend_scores(np.zeros(3), 1, np.array(["2026-08", "2026-09", "2026-10"], dtype="datetime64[M]"),
+                        np.array([30, 30, 30]), np.array([0.6 * 30, 0.6 * 30, -1.0 * 30]))
+    assert abs(busy[0]) < abs(even[0])
+
+def test_trends_of_many_places_match_one_place_at_a_time():
+    def month_rollup(months):
+        dates, sentiment, stars = reviews_by_month(months)
+        return rollup_cells(dates, stars, sentiment)
+
+    rollups = [
+        month_rollup(months)
+        for months in (
+            [("2026-06-01", 0.2, 12), ("2026-08-01", 0.4, 9), ("2026-09-01", 0.3, 15), ("2026-10-01", 0.6, 11)],
+            [("2026-07-01", 0.7, 20), ("2026-08-01", 0.5, 20), ("2026-10-01", 0.2, 20)],
+        )
+    ]
+    combined = pd.concat(rollups, ignore_index=True)
+    place_index = np.repeat([0, 1], [len(rollup) for rollup in rollups])
+    assert np.allclose(
+        rollup_trend_slopes(combined, place_index, 2), [rollup_trend_slopes(rollup)[0] for rollup in rollups]
+    )
+
+TEXTS = ["Great food and friendly service.", "Slow service, cold food.", "Nice ambiance."] * 20
+DATES = np.array(["2026-07-01", "2026-08-01", "2026-09-01", "2026-10-01", "2027-01-01"] * 12, dtype="datetime64[D]")
+SENTIMENT = np.linspace(-0.5, 0.9, len(TEXTS))
+STARS = np.tile([5, 2, 4], 20)
+
+def stored_reviews(tmp_path, batches=1):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    reviews_df = pd.DataFrame({
+        "review_key": [str(i) for i in range(len(TEXTS))], "review": TEXTS, "score": STARS, "date": "",
+        "date_of_review": DATES, "sentiment_score": SENTIMENT,
+    })
+    for rows in np.array_split(np.arange(len(reviews_df)), batches):
+        batch_df = reviews_df.iloc[rows]
+        store.save_reviews("place", batch_df)
+        yield store, batch_df
+
+# The CLI re-scores stored places from the same rollup, and the same date filter, as the app
+def test_store_features_match_the_app_path(tmp_path):
+    texts, dates, sentiment, stars = TEXTS, DATES, SENTIMENT, STARS
+    store, _ = next(stored_reviews(tmp_path))
+    kept = dates <= np.datetime64("today")
+    aspect_matrix, aspects = tag_aspects(np.array(texts)[kept])
+    rollup = rollup_cells(dates[kept], stars[kept], sentiment[kept], aspect_matrix, aspects)
+    expected = review_features(np.zeros(kept.sum(), dtype=np.int64), 1, sentiment[kept], stars[kept], dates[kept], rollup)
+    stored = store_features(store)
+    assert stored["place_id"].tolist() == ["place"]
+    assert np.allclose(stored.drop(columns="place_id").to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64))
+
+def test_classes_follow_thresholds():
+    features = pd.DataFrame({
+        "avg_stars": [4.5, 4.5, 2.0],
+        "recent_sentiment": [0.8, 0.3, 0.8], "star_rating": [0.75, 0.75, -0.5], "disagreement": [0.1, 0.3, 0.1],
+        "complaint_rate": [0.0, 0.2, 0.0], "aspect_score": [0.8, 0.2, 0.8], "trend_slope": [0.0, 0.0, 0.0],
+    })
+    assert score_restaurants(features)["recommendation"].tolist() == ["Must Go", "Recommend", "Do Not Recommend"]
+
+# The provisional verdict shown while scraping is the final one once every review is in
+def test_provisional_verdict_matches_the_final_one(tmp_path):
+    running_stats = RunningReviewStats()
+    for store, batch_df in stored_reviews(tmp_path, batches=3):
+        running_stats.update(batch_df["sentiment_score"], batch_df["score"], batch_df["date_of_review"])
+        snapshot = running_stats.snapshot(store.load_monthly_rollup("place"))
+    final = score_restaurants(store_features(store)).iloc[0]
+    assert snapshot["reviews"] == final["reviews"]
+    assert snapshot["score"] == round(float(final["score"]), 3)
+    assert snapshot["recommendation"] == final["recommendation"]
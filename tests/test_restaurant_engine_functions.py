@@ -0,0 +1,32 @@
+import pandas as pd
+from restaurant_engine_functions import parse_review_dates, tag_aspects, tokenize_reviews
+
+# Stored reviews are tagged from their tokens; mentions must match the regex tagger's
+def test_token_and_regex_aspect_tagging_agree():
+    texts = [
+        "Great value for moneys and tasty Foods.", "The waiters were rude, the dishes cold.",
+        "Value for money", "nothing to see here", "Cosy ambiance, clean toilets!",
+    ]
+    regex_matrix, aspects = tag_aspects(texts)
+    token_matrix, token_aspects = tag_aspects(tokenize_reviews(texts))
+    assert token_aspects == aspects
+    assert ((regex_matrix > 0) != (token_matrix > 0)).nnz == 0
+
+REFERENCE = pd.Timestamp("2026-10-18 15:30")
+
+def test_relative_dates_including_edited_and_short_units():
+    dates, unparsed = parse_review_dates(
+        ["3 weeks ago", "Edited 3 months ago", "a year ago", "5 hours ago", "20 minutes ago", "an hour ago",
+         "Edited yesterday", "just now"],
+        REFERENCE,
+    )
+    assert unparsed == 0
+    assert [str(day.date()) for day in dates] == [
+        "2026-09-27", "2026-07-20", "2025-10-18", "2026-10-18", "2026-10-18", "2026-10-18", "2026-10-17", "2026-10-18",
+    ]
+
+def test_absolute_dates_and_unparsed_count():
+    dates, unparsed = parse_review_dates(["Mar 5, 2023", "2023-03-05", "Edited Jan 2, 2024", "last spring", None], REFERENCE)
+    assert [str(day.date()) for day in dates[:3]] == ["2023-03-05", "2023-03-05", "2024-01-02"]
+    assert dates[3:].isna().all()
+    assert unparsed == 2
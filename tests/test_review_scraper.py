@@ -0,0 +1,34 @@
+import review_scraper
+from review_scraper import iter_review_batches, ScrapeMetrics
+
+# A review panel of newest-first cards that loads ten more on every scroll
+class FakeDriver:
+    def __init__(self, cards):
+        self.cards = cards
+        self.loaded = 0
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, *args):
+        self.loaded = min(self.loaded + 10, len(self.cards))
+        return self.loaded
+
+def scroll(monkeypatch, cards, **kwargs):
+    monkeypatch.setattr(review_scraper, "extract_reviews", lambda driver, div, start=0: driver.cards[start:driver.loaded])
+    metrics = ScrapeMetrics()
+    rows = [row for batch in iter_review_batches(FakeDriver(cards), None, metrics=metrics, initial_wait=0, **kwargs)
+            for row in batch]
+    return rows, metrics
+
+CARDS = [{"review_key": str(i), "review": "x", "score": 5, "date": f"{i // 10 + 1} weeks ago"} for i in range(100)]
+
+def test_stops_at_known_reviews_after_a_complete_crawl(monkeypatch):
+    rows, metrics = scroll(monkeypatch, CARDS, known_keys={str(i) for i in range(10, 100)})
+    assert len(rows) == 10 and metrics.stop_reason == "known_reviews"
+
+# A since_date crawl stored only the newest cards; a later full crawl must not stop at them
+def test_scrolls_past_known_reviews_after_a_partial_crawl(monkeypatch):
+    rows, metrics = scroll(monkeypatch, CARDS, known_keys={str(i) for i in range(20)}, stop_at_known=False)
+    assert [row["review_key"] for row in rows] == [str(i) for i in range(20, 100)]
+    assert metrics.stop_reason == "exhausted"
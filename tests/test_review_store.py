@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from monthly_rollup import rollup_aspect_sentiment
+from restaurant_engine_functions import aggregate_aspect_sentiment, calculate_sentiment_batch
+from review_store import ReviewStore
+
+TEXTS = [
+    "Great food. Service was slow.", "The waiter was rude! Food ok.", "Nice place, cosy ambiance.",
+    "Terrible service and dirty table.", "Price fair. Great value.",
+] * 3
+
+def reviews_frame(texts):
+    return pd.DataFrame({
+        "review_key": [str(i) for i in range(len(texts))],
+        "review": texts,
+        "score": [5, 2, 4, 1, 4] * (len(texts) // 5),
+        "date": "a month ago",
+        "date_of_review": pd.to_datetime(["2026-08-01", "2026-09-01", "2026-10-01"] * (len(texts) // 3)),
+        "sentiment_score": calculate_sentiment_batch(texts)["compound"],
+    })
+
+# Aspect sentences are scored when reviews are stored; saving in overlapping batches must count each once
+def test_stored_aspect_sentiment_matches_a_full_pass(tmp_path):
+    reviews_df = reviews_frame(TEXTS)
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    store.save_reviews("place", reviews_df.iloc[:7])
+    store.save_reviews("place", reviews_df.iloc[5:])
+    expected = aggregate_aspect_sentiment(TEXTS, reviews_df["sentiment_score"])
+    stored = rollup_aspect_sentiment(store.load_monthly_rollup("place"), expected["aspect"])
+    assert stored["mentions"].tolist() == expected["mentions"].tolist()
+    assert np.allclose(stored["sentence_sentiment"], expected["sentence_sentiment"], equal_nan=True)
+    assert np.allclose(stored["mean_sentiment"], expected["mean_sentiment"], equal_nan=True)